@@ -0,0 +1,56 @@
+"""Add completion_mask column to user_progress table
+
+Revision ID: 3c1d7e9a4b52
+Revises: bb62c7adaaa8
+Create Date: 2025-07-02 10:14:27.511203
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d7e9a4b52'
+down_revision: Union[str, None] = 'bb62c7adaaa8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_progress', sa.Column('completion_mask', sa.BigInteger(), server_default='0', nullable=True))
+
+    # Backfill masks from existing completions
+    from app.utils.calendar_utils import get_day_number_from_date
+    from app.utils.streak_utils import compute_completion_mask
+
+    bind = op.get_bind()
+    enrollments = bind.execute(sa.text(
+        "SELECT up.id, up.user_id, up.program_id, up.start_date, p.duration_days "
+        "FROM user_progress up JOIN programs p ON p.id = up.program_id"
+    )).all()
+    for progress_id, user_id, program_id, start_date, duration_days in enrollments:
+        if start_date is None:
+            continue
+        start = datetime.fromisoformat(str(start_date))
+        completion_dates = bind.execute(sa.text(
+            "SELECT c.completion_date FROM user_activity_completions c "
+            "JOIN activities a ON a.id = c.activity_id "
+            "WHERE c.user_id = :user_id AND a.program_id = :program_id"
+        ), {"user_id": user_id, "program_id": program_id}).scalars()
+        mask = compute_completion_mask(
+            (get_day_number_from_date(start, datetime.fromisoformat(str(value))) for value in completion_dates),
+            duration_days or 30
+        )
+        bind.execute(
+            sa.text("UPDATE user_progress SET completion_mask = :mask WHERE id = :id"),
+            {"mask": mask, "id": progress_id}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_progress', 'completion_mask')
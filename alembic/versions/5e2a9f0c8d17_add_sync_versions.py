@@ -0,0 +1,60 @@
+"""Add updated_at and version columns for delta sync
+
+Revision ID: 5e2a9f0c8d17
+Revises: 3c1d7e9a4b52
+Create Date: 2025-07-09 16:42:03.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a9f0c8d17'
+down_revision: Union[str, None] = '3c1d7e9a4b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ['programs', 'activities', 'user_activity_completions']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+            batch_op.add_column(sa.Column('version', sa.BigInteger(), nullable=True))
+
+    op.create_table(
+        'sync_counter',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('value', sa.BigInteger, nullable=False),
+    )
+
+    # Give existing rows distinct versions so a full sync still returns them
+    bind = op.get_bind()
+    offset = 0
+    for table in VERSIONED_TABLES:
+        bind.execute(sa.text(f"UPDATE {table} SET version = id + :offset"), {"offset": offset})
+        offset += bind.execute(sa.text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar()
+    bind.execute(sa.text("INSERT INTO sync_counter (id, value) VALUES (1, :value)"), {"value": offset})
+
+    op.create_index(op.f('ix_programs_version'), 'programs', ['version'], unique=False)
+    op.create_index('ix_activities_program_id_version', 'activities', ['program_id', 'version'], unique=False)
+    op.create_index(
+        'ix_user_activity_completions_user_id_version', 'user_activity_completions', ['user_id', 'version'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_activity_completions_user_id_version', table_name='user_activity_completions')
+    op.drop_index('ix_activities_program_id_version', table_name='activities')
+    op.drop_index(op.f('ix_programs_version'), table_name='programs')
+    op.drop_table('sync_counter')
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,41 @@
+"""Add full-text search index over programs and activities
+
+Revision ID: 7a4b0e6f1c93
+Revises: 5e2a9f0c8d17
+Create Date: 2025-07-15 11:08:51.402617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.search import create_search_index, rebuild_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4b0e6f1c93'
+down_revision: Union[str, None] = '5e2a9f0c8d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    create_search_index(bind, 'programs')
+    create_search_index(bind, 'activities')
+    rebuild_search_index(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('programs_search_ai', 'programs_search_au', 'programs_search_ad',
+                        'activities_search_ai', 'activities_search_au', 'activities_search_ad'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS search_index')
+    elif bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_activities_search')
+        op.execute('DROP INDEX IF EXISTS ix_programs_search')
@@ -0,0 +1,49 @@
+"""Add user_activity_completions_archive table
+
+Revision ID: 9d3f6b2e5a08
+Revises: 7a4b0e6f1c93
+Create Date: 2025-07-22 09:31:46.207519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6b2e5a08'
+down_revision: Union[str, None] = '7a4b0e6f1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Archived completions keep their ids, so SQLite must not hand a freed id out again
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table(
+            'user_activity_completions', recreate='always', table_kwargs={'sqlite_autoincrement': True}
+        ):
+            pass
+
+    op.create_table(
+        'user_activity_completions_archive',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer),
+        sa.Column('activity_id', sa.Integer),
+        sa.Column('completed_at', sa.DateTime),
+        sa.Column('completion_date', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime),
+        sa.Column('version', sa.BigInteger),
+        sa.Column('archived_at', sa.DateTime, server_default=sa.func.now()),
+    )
+    op.create_index(
+        op.f('ix_user_activity_completions_archive_user_id'), 'user_activity_completions_archive', ['user_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_activity_completions_archive_user_id'), table_name='user_activity_completions_archive')
+    op.drop_table('user_activity_completions_archive')
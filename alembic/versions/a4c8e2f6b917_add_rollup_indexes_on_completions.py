@@ -0,0 +1,34 @@
+"""Add version and completion_date indexes to hot and archived completions for rollups
+
+Revision ID: a4c8e2f6b917
+Revises: f1a6d2b8c539
+Create Date: 2025-08-18 11:26:40.913857
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e2f6b917'
+down_revision: Union[str, None] = 'f1a6d2b8c539'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COMPLETION_TABLES = ['user_activity_completions', 'user_activity_completions_archive']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in COMPLETION_TABLES:
+        op.create_index(f'ix_{table}_version', table, ['version'], unique=False)
+        op.create_index(f'ix_{table}_completion_date', table, ['completion_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COMPLETION_TABLES:
+        op.drop_index(f'ix_{table}_completion_date', table_name=table)
+        op.drop_index(f'ix_{table}_version', table_name=table)
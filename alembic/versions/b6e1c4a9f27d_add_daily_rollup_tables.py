@@ -0,0 +1,50 @@
+"""Add daily rollup tables
+
+Revision ID: b6e1c4a9f27d
+Revises: 9d3f6b2e5a08
+Create Date: 2025-07-29 14:05:12.839214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1c4a9f27d'
+down_revision: Union[str, None] = '9d3f6b2e5a08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_program_rollups',
+        sa.Column('program_id', sa.Integer, primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('completions', sa.Integer),
+        sa.Column('active_users', sa.Integer),
+        sa.Column('minutes', sa.Integer),
+    )
+    op.create_table(
+        'daily_category_rollups',
+        sa.Column('program_id', sa.Integer, primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('category', sa.String, primary_key=True),
+        sa.Column('completions', sa.Integer),
+        sa.Column('minutes', sa.Integer),
+    )
+    op.create_table(
+        'rollup_state',
+        sa.Column('name', sa.String, primary_key=True),
+        sa.Column('high_water_mark', sa.BigInteger),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rollup_state')
+    op.drop_table('daily_category_rollups')
+    op.drop_table('daily_program_rollups')
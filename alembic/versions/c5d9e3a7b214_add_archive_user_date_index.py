@@ -0,0 +1,30 @@
+"""Add a (user_id, completion_date) index to archived completions for plan reads
+
+Revision ID: c5d9e3a7b214
+Revises: a4c8e2f6b917
+Create Date: 2025-08-19 09:42:17.305128
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d9e3a7b214'
+down_revision: Union[str, None] = 'a4c8e2f6b917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_user_activity_completions_archive_user_id_completion_date',
+                    'user_activity_completions_archive', ['user_id', 'completion_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_activity_completions_archive_user_id_completion_date',
+                  table_name='user_activity_completions_archive')
@@ -0,0 +1,38 @@
+"""Add idempotency keys table
+
+Revision ID: d2f8a5c7e314
+Revises: b6e1c4a9f27d
+Create Date: 2025-08-12 10:22:41.517038
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f8a5c7e314'
+down_revision: Union[str, None] = 'b6e1c4a9f27d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('key', sa.String, primary_key=True),
+        sa.Column('fingerprint', sa.String, nullable=False),
+        sa.Column('status_code', sa.Integer, nullable=True),
+        sa.Column('headers', sa.Text, nullable=True),
+        sa.Column('body', sa.LargeBinary, nullable=True),
+        sa.Column('expires_at', sa.DateTime, nullable=False),
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,35 @@
+"""Add enrolled_version to user_progress for delta sync of new enrollments
+
+Revision ID: e7b3c9d1f402
+Revises: d2f8a5c7e314
+Create Date: 2025-08-14 09:37:12.604418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3c9d1f402'
+down_revision: Union[str, None] = 'd2f8a5c7e314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing enrollments stay NULL: their programs already went out with a full sync
+    with op.batch_alter_table('user_progress') as batch_op:
+        batch_op.add_column(sa.Column('enrolled_version', sa.BigInteger(), nullable=True))
+    op.create_index(
+        'ix_user_progress_user_id_enrolled_version', 'user_progress', ['user_id', 'enrolled_version'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_progress_user_id_enrolled_version', table_name='user_progress')
+    with op.batch_alter_table('user_progress') as batch_op:
+        batch_op.drop_column('enrolled_version')
@@ -0,0 +1,34 @@
+"""Add shard rebalance table
+
+Revision ID: e8a2f4c6d913
+Revises: c5d9e3a7b214
+Create Date: 2025-08-19 14:05:32.861447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a2f4c6d913'
+down_revision: Union[str, None] = 'c5d9e3a7b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'shard_rebalance',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('shard_tags', sa.String, nullable=False),
+        sa.Column('finished', sa.Boolean, nullable=True),
+        sa.Column('started_at', sa.DateTime, server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('shard_rebalance')
@@ -0,0 +1,37 @@
+"""Widen user-scoped row ids to 64 bits for per-shard id ranges
+
+Revision ID: f1a6d2b8c539
+Revises: e7b3c9d1f402
+Create Date: 2025-08-15 14:03:58.271930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6d2b8c539'
+down_revision: Union[str, None] = 'e7b3c9d1f402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_TABLES = ['user_progress', 'user_activity_completions', 'user_activity_completions_archive']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite integer primary keys are already 64-bit rowids
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table in USER_TABLES:
+        op.alter_column(table, 'id', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table in USER_TABLES:
+        op.alter_column(table, 'id', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
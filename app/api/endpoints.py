@@ -1,43 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date as date_type, datetime, timedelta
 
+from app.config import PROFILING_TOKEN, RETRY_AFTER_SECONDS
+from app.database import repository
 from app.database.database import get_db
-from app.models.models import Program, Activity, User, UserProgress, UserActivityCompletion
+from app.database.sharding import (
+    get_user_db, open_user_sessions, session_for_user, session_id_base, session_shard_tag, shard_index, user_sessions
+)
+from app.database.archive import completion_history
+from app.database.search import search_catalog
+from app.database.snapshot import catalog_changed, get_catalog_snapshot
+from app.database.versioning import SyncCursor, decode_cursor, encode_cursor, reserve_versions
+from app.middleware.profiling import ProfiledRoute
+from app.models.models import (
+    Program, Activity, User, UserProgress, UserActivityCompletion, DailyProgramRollup, DailyCategoryRollup,
+    SyncCounter
+)
 from app.schemas.schemas import (
-    Program as ProgramSchema, ProgramCreate,
-    Activity as ActivitySchema, ActivityCreate, ActivityWithCompletion,
+    Program as ProgramSchema, ProgramCreate, ProgramImport, ProgramImportResult, ImportSummary,
+    Activity as ActivitySchema, ActivityCreate,
     User as UserSchema, UserCreate,
     UserProgress as UserProgressSchema, UserProgressCreate,
+    CohortEnrollmentRequest, CohortEnrollmentResult, ProgramAnalytics, StreakSummary, SyncFeed,
+    SearchResults, ProgramDailyStats, DailyProgramStats, CategoryStats,
     DayPlan, WeekPlan, ActivityCompletionRequest
 )
 from app.utils.calendar_utils import (
     get_week_date_range, get_day_number_from_date, 
     get_date_from_day_number, get_current_week_dates
 )
+from app.utils.field_utils import (
+    ACTIVITY_FIELDS, PLAN_ACTIVITY_FIELDS, PROGRAM_FIELDS, FieldSelector, nested_fields, pick_fields
+)
+from app.utils.pubsub import broker, format_sse, user_channel
+from app.utils.singleflight import SingleFlightTimeout, reads
+from app.utils.streak_utils import (
+    MASK_DAYS, completion_heatmap, count_completed_days, current_streak, day_bit, longest_streak, tracks_streaks
+)
+from app.utils.analytics_utils import (
+    compute_program_metrics, load_activities_per_day, load_completion_matrix
+)
+from app.utils.import_utils import (
+    IMPORT_BATCH_SIZE, aiter_ndjson_lines, import_batch, import_program
+)
+from app.utils.export_utils import (
+    EXPORT_MEDIA_TYPES, completion_export_query, stream_completion_export
+)
 
-router = APIRouter()
+# Synchronous (def) endpoints run in the threadpool, so they need their own profiler hook;
+# the route class only changes when profiling is on
+router = APIRouter(route_class=ProfiledRoute if PROFILING_TOKEN else APIRoute)
 
 @router.post("/programs/", response_model=ProgramSchema)
 def create_program(program: ProgramCreate, db: Session = Depends(get_db)):
     db_program = Program(**program.dict())
     db.add(db_program)
     db.commit()
+    catalog_changed()
     db.refresh(db_program)
     return db_program
 
+# Bulk import: a program with all of its activities in one transaction
+@router.post("/programs/import", response_model=ProgramImportResult)
+def import_single_program(program: ProgramImport, db: Session = Depends(get_db)):
+    result = import_program(db, program)
+    catalog_changed()
+    return result
+
+# Bulk import: a stream of NDJSON programs, validated and inserted in batches
+@router.post("/programs/import/ndjson", response_model=ImportSummary)
+async def import_programs_ndjson(
+    request: Request,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    summary = ImportSummary()
+    batch = []
+    line_number = 0
+    async for line in aiter_ndjson_lines(request.stream()):
+        line_number += 1
+        if not line.strip():
+            continue
+        batch.append((line_number, line))
+        if len(batch) >= batch_size:
+            await run_in_threadpool(import_batch, db, batch, summary)
+            batch = []
+    if batch:
+        await run_in_threadpool(import_batch, db, batch, summary)
+    if summary.programs_created:
+        await run_in_threadpool(catalog_changed)
+    return summary
+
+def _program_payloads(db: Session, fields: List[str], program_id: Optional[int] = None) -> List[dict]:
+    """Programs limited to `fields`, reading only the matching columns"""
+    columns = [field for field in fields if field != "activities" and "." not in field]
+    activity_fields = ACTIVITY_FIELDS if "activities" in fields else nested_fields(fields, "activities")
+    rows = repository.get_program_rows(db, columns, program_id)
+    payloads = [pick_fields(row, columns) for row in rows]
+    if activity_fields and rows:
+        activities = repository.get_activity_rows_for_programs(db, [row.id for row in rows], activity_fields)
+        by_program = {}
+        for activity in activities:
+            by_program.setdefault(activity.program_id, []).append(pick_fields(activity, activity_fields))
+        for payload, row in zip(payloads, rows):
+            payload["activities"] = by_program.get(row.id, [])
+    return payloads
+
 @router.get("/programs/", response_model=List[ProgramSchema])
-def get_programs(db: Session = Depends(get_db)):
-    return db.query(Program).all()
+def get_programs(
+    fields: Optional[List[str]] = Depends(FieldSelector(PROGRAM_FIELDS)),
+    db: Session = Depends(get_db)
+):
+    if fields:
+        return JSONResponse(jsonable_encoder(_program_payloads(db, fields)))
+    return db.query(Program).options(selectinload(Program.activities)).all()
+
+def _coalesced(key, fn):
+    """Share one lookup between identical concurrent requests (see app.utils.singleflight)"""
+    try:
+        return reads.do(key, fn)
+    except SingleFlightTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="Lookup timed out, retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
 
 @router.get("/programs/{program_id}", response_model=ProgramSchema)
-def get_program(program_id: int, db: Session = Depends(get_db)):
-    program = db.query(Program).filter(Program.id == program_id).first()
+def get_program(
+    program_id: int,
+    fields: Optional[List[str]] = Depends(FieldSelector(PROGRAM_FIELDS)),
+    db: Session = Depends(get_db)
+):
+    if fields:
+        payloads = _coalesced(
+            ("program", program_id, tuple(fields)), lambda: _program_payloads(db, fields, program_id)
+        )
+        if not payloads:
+            raise HTTPException(status_code=404, detail="Program not found")
+        return JSONResponse(jsonable_encoder(payloads[0]))
+    
+    snapshot = get_catalog_snapshot()
+    if snapshot is not None and snapshot.has_program(program_id):
+        return ProgramSchema(**snapshot.get_program(program_id))
+    
+    def load_program():
+        program = db.query(Program).filter(Program.id == program_id).first()
+        # Validated in the leader so waiters never touch the leader's session
+        return ProgramSchema.model_validate(program) if program else None
+    
+    program = _coalesced(("program", program_id), load_program)
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
-# But FastAPI sees that you’ve declared response_model=ProgramSchema, so it uses Pydantic to convert the SQLAlchemy object to a JSON-compatible dict.
-#     return program
+    return program
+
+@router.get("/programs/{program_id}/activities", response_model=List[ActivitySchema])
+def get_program_activities(
+    program_id: int,
+    day_number: Optional[int] = Query(None, description="Only activities for this program day"),
+    fields: Optional[List[str]] = Depends(FieldSelector(ACTIVITY_FIELDS)),
+    db: Session = Depends(get_db)
+):
+    if fields:
+        def load_rows():
+            if day_number is None:
+                rows = repository.get_activity_rows_for_program(db, program_id, fields)
+            else:
+                rows = repository.get_activity_rows_for_days(db, program_id, day_number, day_number, fields)
+            return [pick_fields(row, fields) for row in rows]
+        
+        payloads = _coalesced(("activities", program_id, day_number, tuple(fields)), load_rows)
+        return JSONResponse(jsonable_encoder(payloads))
+    
+    # Programs created since the snapshot was built fall through to the database
+    snapshot = get_catalog_snapshot()
+    if snapshot is not None and snapshot.has_program(program_id):
+        if day_number is None:
+            return snapshot.activities_for_program(program_id)
+        return snapshot.activities_for_days(program_id, day_number, day_number)
+    
+    def load_activities():
+        if day_number is None:
+            return repository.get_activities_for_program(db, program_id)
+        return repository.get_activities_for_day(db, program_id, day_number)
+    
+    return _coalesced(("activities", program_id, day_number), load_activities)
+
+# Full-text search over programs and activities
+@router.get("/search", response_model=SearchResults)
+def search(
+    q: str = Query(..., min_length=1, description="Search terms"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    return SearchResults(query=q, limit=limit, offset=offset, results=search_catalog(db, q, limit, offset))
 
 # Activity endpoints
 @router.post("/activities/", response_model=ActivitySchema)
@@ -45,6 +210,7 @@ def create_activity(activity: ActivityCreate, db: Session = Depends(get_db)):
     db_activity = Activity(**activity.dict())
     db.add(db_activity)
     db.commit()
+    catalog_changed()
     db.refresh(db_activity)
     return db_activity
 
@@ -67,21 +233,126 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 # User Progress endpoints
 @router.post("/user-progress/", response_model=UserProgressSchema)
 def start_program(progress: UserProgressCreate, db: Session = Depends(get_db)):
-    # Check if user already has active progress for this program
-    existing = db.query(UserProgress).filter(
-        UserProgress.user_id == progress.user_id,
-        UserProgress.program_id == progress.program_id,
-        UserProgress.is_active == True
-    ).first()
+    with session_for_user(db, progress.user_id) as user_db:
+        # Check if user already has active progress for this program
+        existing = repository.get_active_progress(user_db, progress.user_id, progress.program_id)
+        
+        if existing:
+            raise HTTPException(status_code=400, detail="User already has active progress for this program")
+        
+        db_progress = UserProgress(**progress.dict())
+        user_db.add(db_progress)
+        user_db.commit()
+        user_db.refresh(db_progress)
+        return UserProgressSchema.model_validate(db_progress)
+
+def _user_ids_on_shard(user_ids: set, sessions: List[Session], user_db: Session) -> set:
+    """The subset of `user_ids` stored on the shard behind `user_db`"""
+    if len(sessions) == 1:
+        return user_ids
+    index = sessions.index(user_db)
+    return {user_id for user_id in user_ids if shard_index(user_id, len(sessions)) == index}
+
+# Cohort enrollment: enroll many users into a program at once
+@router.post("/programs/{program_id}/enroll", response_model=CohortEnrollmentResult)
+def enroll_cohort(program_id: int, enrollment: CohortEnrollmentRequest, db: Session = Depends(get_db)):
+    if db.get(Program, program_id) is None:
+        raise HTTPException(status_code=404, detail="Program not found")
+
+    user_ids = set(enrollment.user_ids)
+
+    # One set-based query for known users, then one per shard for existing active enrollments
+    known_user_ids = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+    already_enrolled = set()
+    enrolled = 0
+    with user_sessions(db) as sessions:
+        for user_db in sessions:
+            shard_user_ids = _user_ids_on_shard(known_user_ids, sessions, user_db)
+            if not shard_user_ids:
+                continue
+            shard_enrolled = set(user_db.scalars(
+                select(UserProgress.user_id).where(
+                    UserProgress.program_id == program_id,
+                    UserProgress.is_active == True,
+                    UserProgress.user_id.in_(shard_user_ids)
+                )
+            ))
+            already_enrolled |= shard_enrolled
+
+            to_enroll = sorted(shard_user_ids - shard_enrolled)
+            if to_enroll:
+                # Core inserts skip the flush-time versioning hook, so reserve the versions (and shard ids) here
+                first_version = reserve_versions(user_db.connection(), SyncCounter.__table__, len(to_enroll))
+                id_base = session_id_base(user_db)
+                rows = [
+                    {
+                        "user_id": user_id,
+                        "program_id": program_id,
+                        "start_date": enrollment.start_date,
+                        "current_day": 1,
+                        "is_active": True,
+                        "enrolled_version": first_version + offset
+                    }
+                    for offset, user_id in enumerate(to_enroll)
+                ]
+                if id_base is not None:
+                    for row in rows:
+                        row["id"] = id_base + row["enrolled_version"]
+                user_db.execute(insert(UserProgress), rows)
+                user_db.commit()
+                enrolled += len(to_enroll)
+
+    return CohortEnrollmentResult(
+        program_id=program_id,
+        requested=len(user_ids),
+        enrolled=enrolled,
+        already_enrolled=len(already_enrolled),
+        unknown_user_ids=sorted(user_ids - known_user_ids)
+    )
+
+def _build_day_plan(plan_date: datetime, day_number: int, activities, completions, fields=None) -> dict:
+    """Combine a day's activities with the user's completions for that date.
+
+    Returns a DayPlan-shaped dict; with `fields`, activities carry only those keys.
+    """
+    activity_fields = fields or PLAN_ACTIVITY_FIELDS
+    columns = [field for field in activity_fields if field in ACTIVITY_FIELDS]
+    completion_map = {comp.activity_id: comp.completed_at for comp in completions}
     
-    if existing:
-        raise HTTPException(status_code=400, detail="User already has active progress for this program")
+    # Build activities with completion status
+    activities_with_completion = []
+    completed_activities = 0
+    for activity in activities:
+        is_completed = activity.id in completion_map
+        completed_activities += is_completed
+        activity_dict = pick_fields(activity, columns)
+        if "is_completed" in activity_fields:
+            activity_dict["is_completed"] = is_completed
+        if "completed_at" in activity_fields:
+            activity_dict["completed_at"] = completion_map.get(activity.id)
+        activities_with_completion.append(activity_dict)
     
-    db_progress = UserProgress(**progress.dict())
-    db.add(db_progress)
-    db.commit()
-    db.refresh(db_progress)
-    return db_progress
+    # Calculate completion stats
+    total_activities = len(activities_with_completion)
+    completion_percentage = (completed_activities / total_activities * 100) if total_activities > 0 else 0
+    
+    return {
+        "date": plan_date,
+        "day_number": day_number,
+        "activities": activities_with_completion,
+        "total_activities": total_activities,
+        "completed_activities": completed_activities,
+        "completion_percentage": completion_percentage
+    }
+
+def _load_activities(db: Session, program_id: int, first_day: int, last_day: int, fields):
+    if fields:
+        columns = [field for field in fields if field in ACTIVITY_FIELDS]
+        return repository.get_activity_rows_for_days(db, program_id, first_day, last_day, columns)
+    snapshot = get_catalog_snapshot()
+    if snapshot is not None and snapshot.has_program(program_id):
+        return snapshot.activities_for_days(program_id, first_day, last_day)
+    return repository.get_activities_for_days(db, program_id, first_day, last_day)
 
 # Main API: Get Day Plan
 @router.get("/users/{user_id}/programs/{program_id}/day-plan", response_model=DayPlan)
@@ -89,14 +360,11 @@ def get_day_plan(
     user_id: int, 
     program_id: int, 
     date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format"),
-    db: Session = Depends(get_db)
+    fields: Optional[List[str]] = Depends(FieldSelector(PLAN_ACTIVITY_FIELDS)),
+    db: Session = Depends(get_user_db)
 ):
     # Get user progress
-    progress = db.query(UserProgress).filter(
-        UserProgress.user_id == user_id,
-        UserProgress.program_id == program_id,
-        UserProgress.is_active == True
-    ).first()
+    progress = repository.get_active_progress(db, user_id, program_id)
     
     if not progress:
         raise HTTPException(status_code=404, detail="User progress not found")
@@ -117,51 +385,13 @@ def get_day_plan(
     if day_number < 1 or day_number > 30:
         raise HTTPException(status_code=400, detail="Date is outside program duration")
     
-    # Get activities for this day
-    activities = db.query(Activity).filter(
-        Activity.program_id == program_id,
-        Activity.day_number == day_number
-    ).all()
-    
-    # Get user completions for this date
-    completions = db.query(UserActivityCompletion).filter(
-        UserActivityCompletion.user_id == user_id,
-        UserActivityCompletion.completion_date >= target_date,
-        UserActivityCompletion.completion_date < target_date + timedelta(days=1)
-    ).all()
-    
-    completed_activity_ids = {comp.activity_id for comp in completions}
-    completion_map = {comp.activity_id: comp.completed_at for comp in completions}
-    
-    # Build activities with completion status
-    activities_with_completion = []
-    for activity in activities:
-        activity_dict = {
-            "id": activity.id,
-            "program_id": activity.program_id,
-            "title": activity.title,
-            "description": activity.description,
-            "day_number": activity.day_number,
-            "duration_minutes": activity.duration_minutes,
-            "category": activity.category,
-            "is_completed": activity.id in completed_activity_ids,
-            "completed_at": completion_map.get(activity.id)
-        }
-        activities_with_completion.append(ActivityWithCompletion(**activity_dict))
-    
-    # Calculate completion stats
-    total_activities = len(activities_with_completion)
-    completed_activities = len([a for a in activities_with_completion if a.is_completed])
-    completion_percentage = (completed_activities / total_activities * 100) if total_activities > 0 else 0
+    activities = _load_activities(db, program_id, day_number, day_number, fields)
+    completions = repository.get_completions_in_range(db, user_id, target_date, target_date + timedelta(days=1))
     
-    return DayPlan(
-        date=target_date,
-        day_number=day_number,
-        activities=activities_with_completion,
-        total_activities=total_activities,
-        completed_activities=completed_activities,
-        completion_percentage=completion_percentage
-    )
+    plan = _build_day_plan(target_date, day_number, activities, completions, fields)
+    if fields:
+        return JSONResponse(jsonable_encoder(plan))
+    return DayPlan(**plan)
 
 # Main API: Get Week Plan (Days 14-21)
 @router.get("/users/{user_id}/programs/{program_id}/week-plan", response_model=WeekPlan)
@@ -169,14 +399,11 @@ def get_week_plan(
     user_id: int, 
     program_id: int, 
     week: int = Query(3, description="Week number (1-4), default is week 3 (days 14-21)"),
-    db: Session = Depends(get_db)
+    fields: Optional[List[str]] = Depends(FieldSelector(PLAN_ACTIVITY_FIELDS)),
+    db: Session = Depends(get_user_db)
 ):
     # Get user progress
-    progress = db.query(UserProgress).filter(
-        UserProgress.user_id == user_id,
-        UserProgress.program_id == program_id,
-        UserProgress.is_active == True
-    ).first()
+    progress = repository.get_active_progress(db, user_id, program_id)
     
     if not progress:
         raise HTTPException(status_code=404, detail="User progress not found")
@@ -186,63 +413,34 @@ def get_week_plan(
     
     # Calculate week date range
     week_start, week_end = get_week_date_range(progress.start_date, week)
+    first_day = get_day_number_from_date(progress.start_date, week_start)
+    last_day = min(first_day + 6, 30)  # Skip days beyond program duration
+    
+    # Load the whole week with one query each for activities and completions
+    activities_by_day = {}
+    for activity in _load_activities(db, program_id, first_day, last_day, fields):
+        activities_by_day.setdefault(activity.day_number, []).append(activity)
+    
+    completions_by_offset = {}
+    week_completions = repository.get_completions_in_range(
+        db, user_id, week_start, week_start + timedelta(days=last_day - first_day + 1)
+    )
+    for comp in week_completions:
+        offset = (comp.completion_date - week_start).days
+        completions_by_offset.setdefault(offset, []).append(comp)
     
-    # Get day plans for each day of the week
     days = []
-    for i in range(7):
-        current_date = week_start + timedelta(days=i)
-        day_number = get_day_number_from_date(progress.start_date, current_date)
-        
-        if day_number > 30:  # Skip days beyond program duration
-            break
-            
-        # Get activities for this day
-        activities = db.query(Activity).filter(
-            Activity.program_id == program_id,
-            Activity.day_number == day_number
-        ).all()
-        
-        # Get completions for this date
-        completions = db.query(UserActivityCompletion).filter(
-            UserActivityCompletion.user_id == user_id,
-            UserActivityCompletion.completion_date >= current_date,
-            UserActivityCompletion.completion_date < current_date + timedelta(days=1)
-        ).all()
-        
-        completed_activity_ids = {comp.activity_id for comp in completions}
-        completion_map = {comp.activity_id: comp.completed_at for comp in completions}
-        
-        # Build activities with completion status
-        activities_with_completion = []
-        for activity in activities:
-            activity_dict = {
-                "id": activity.id,
-                "program_id": activity.program_id,
-                "title": activity.title,
-                "description": activity.description,
-                "day_number": activity.day_number,
-                "duration_minutes": activity.duration_minutes,
-                "category": activity.category,
-                "is_completed": activity.id in completed_activity_ids,
-                "completed_at": completion_map.get(activity.id)
-            }
-            activities_with_completion.append(ActivityWithCompletion(**activity_dict))
-        
-        # Calculate completion stats
-        total_activities = len(activities_with_completion)
-        completed_activities = len([a for a in activities_with_completion if a.is_completed])
-        completion_percentage = (completed_activities / total_activities * 100) if total_activities > 0 else 0
-        
-        day_plan = DayPlan(
-            date=current_date,
-            day_number=day_number,
-            activities=activities_with_completion,
-            total_activities=total_activities,
-            completed_activities=completed_activities,
-            completion_percentage=completion_percentage
-        )
-        days.append(day_plan)
+    for i in range(last_day - first_day + 1):
+        days.append(_build_day_plan(
+            week_start + timedelta(days=i),
+            first_day + i,
+            activities_by_day.get(first_day + i, []),
+            completions_by_offset.get(i, []),
+            fields
+        ))
     
+    if fields:
+        return JSONResponse(jsonable_encoder({"start_date": week_start, "end_date": week_end, "days": days}))
     return WeekPlan(
         start_date=week_start,
         end_date=week_end,
@@ -254,20 +452,18 @@ def get_week_plan(
 def complete_activity(
     user_id: int,
     completion: ActivityCompletionRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     # Check if activity exists
-    activity = db.query(Activity).filter(Activity.id == completion.activity_id).first()
+    activity = repository.get_activity(db, completion.activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     
     # Check if already completed on this date
-    existing = db.query(UserActivityCompletion).filter(
-        UserActivityCompletion.user_id == user_id,
-        UserActivityCompletion.activity_id == completion.activity_id,
-        UserActivityCompletion.completion_date >= completion.completion_date,
-        UserActivityCompletion.completion_date < completion.completion_date + timedelta(days=1)
-    ).first()
+    existing = repository.completion_exists(
+        db, user_id, completion.activity_id,
+        completion.completion_date, completion.completion_date + timedelta(days=1)
+    )
     
     if existing:
         raise HTTPException(status_code=400, detail="Activity already completed for this date")
@@ -279,36 +475,112 @@ def complete_activity(
         completion_date=completion.completion_date
     )
     db.add(db_completion)
+    
+    # Keep the enrollment's completion mask in sync for streaks and heatmaps
+    progress = repository.get_active_progress(db, user_id, activity.program_id)
+    # Enrollments without a start date, or in programs too long for the mask, have no streaks to keep
+    if progress and progress.start_date is not None and tracks_streaks(progress.duration_days or 30):
+        day_number = get_day_number_from_date(progress.start_date, completion.completion_date)
+        if 1 <= day_number <= (progress.duration_days or 30):
+            # OR the bit in SQL so concurrent completions cannot overwrite each other
+            db.execute(
+                update(UserProgress)
+                .where(UserProgress.id == progress.id)
+                .values(completion_mask=UserProgress.completion_mask.op("|")(day_bit(day_number)))
+            )
     db.commit()
     
+    broker.publish(user_channel(user_id), {
+        "type": "activity_completed",
+        "coalesce_key": f"{activity.program_id}:{completion.completion_date.date()}:{activity.id}",
+        "program_id": activity.program_id,
+        "activity_id": activity.id,
+        "day_number": activity.day_number,
+        "completion_date": completion.completion_date.isoformat(),
+    })
+    
     return {"message": "Activity marked as complete", "completed_at": db_completion.completed_at}
 
+# Live progress updates as server-sent events
+SSE_HEARTBEAT_SECONDS = 15
+
+@router.get("/users/{user_id}/events")
+async def stream_user_events(user_id: int):
+    subscription = broker.subscribe(user_channel(user_id))
+    
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                events, dropped = await subscription.next_batch(timeout=SSE_HEARTBEAT_SECONDS)
+                if dropped:
+                    # The client fell behind; tell it to re-fetch instead of replaying everything
+                    yield format_sse("resync", {"dropped": dropped})
+                for event in events:
+                    yield format_sse(event["type"], event)
+                if not events and not dropped:
+                    yield ": heartbeat\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Streaks and calendar heatmap, computed from the enrollment's completion mask
+@router.get("/users/{user_id}/programs/{program_id}/streak", response_model=StreakSummary)
+def get_streak(user_id: int, program_id: int, db: Session = Depends(get_user_db)):
+    progress = repository.get_active_progress(db, user_id, program_id)
+    
+    if not progress:
+        raise HTTPException(status_code=404, detail="User progress not found")
+    if progress.start_date is None:
+        raise HTTPException(status_code=409, detail="Enrollment has no start date")
+    
+    duration_days = progress.duration_days or 30
+    if not tracks_streaks(duration_days):
+        raise HTTPException(
+            status_code=422, detail=f"Streaks are only tracked for programs of up to {MASK_DAYS} days"
+        )
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    current_day = min(get_day_number_from_date(progress.start_date, today), duration_days)
+    mask = progress.completion_mask or 0
+    
+    return StreakSummary(
+        user_id=user_id,
+        program_id=program_id,
+        current_day=current_day,
+        current_streak=current_streak(mask, current_day),
+        longest_streak=longest_streak(mask),
+        completed_days=count_completed_days(mask),
+        heatmap=completion_heatmap(mask, duration_days)
+    )
+
 # Get User's Program Progress Summary
 @router.get("/users/{user_id}/programs/{program_id}/progress-summary")
-def get_progress_summary(user_id: int, program_id: int, db: Session = Depends(get_db)):
-    progress = db.query(UserProgress).filter(
-        UserProgress.user_id == user_id,
-        UserProgress.program_id == program_id,
-        UserProgress.is_active == True
-    ).first()
+def get_progress_summary(user_id: int, program_id: int, db: Session = Depends(get_user_db)):
+    progress = repository.get_active_progress(db, user_id, program_id)
     
     if not progress:
         raise HTTPException(status_code=404, detail="User progress not found")
     
     # Calculate total completions
-    total_completions = db.query(UserActivityCompletion).filter(
-        UserActivityCompletion.user_id == user_id
-    ).join(Activity).filter(Activity.program_id == program_id).count()
+    history = completion_history(user_id)
+    total_completions = db.scalar(
+        select(func.count())
+        .select_from(history)
+        .join(Activity, Activity.id == history.c.activity_id)
+        .where(Activity.program_id == program_id)
+    )
     
     # Calculate total activities up to current day
     current_day = get_day_number_from_date(progress.start_date, datetime.now())
     if current_day > 30:
         current_day = 30
     
-    total_activities = db.query(Activity).filter(
-        Activity.program_id == program_id,
-        Activity.day_number <= current_day
-    ).count()
+    total_activities = repository.count_activities_through_day(db, program_id, current_day)
     
     completion_rate = (total_completions / total_activities * 100) if total_activities > 0 else 0
     
@@ -321,4 +593,144 @@ def get_progress_summary(user_id: int, program_id: int, db: Session = Depends(ge
         "completed_activities": total_completions,
         "completion_rate": completion_rate,
         "is_active": progress.is_active
-    }
\ No newline at end of file
+    }
+
+# Delta sync feed for offline-first clients
+@router.get("/users/{user_id}/sync", response_model=SyncFeed)
+def sync_changes(
+    user_id: int,
+    since: Optional[str] = Query(None, description="Cursor from the previous sync; omit for a full sync"),
+    db: Session = Depends(get_user_db)
+):
+    try:
+        cursor = decode_cursor(since) if since else SyncCursor(0, session_shard_tag(db), 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+    # User versions from another shard's counter mean nothing here (the user was rebalanced): resend the user's rows
+    user_since = cursor.user_version if cursor.shard_tag == session_shard_tag(db) else 0
+    
+    program_ids = select(UserProgress.program_id).where(
+        UserProgress.user_id == user_id,
+        UserProgress.is_active == True
+    ).scalar_subquery()
+    # Programs enrolled in after the cursor are sent whole, however old their content is
+    enrollments = db.execute(
+        select(UserProgress.program_id, UserProgress.enrolled_version).where(
+            UserProgress.user_id == user_id,
+            UserProgress.is_active == True,
+            UserProgress.enrolled_version > user_since
+        )
+    ).all()
+    new_program_ids = [enrollment.program_id for enrollment in enrollments]
+    
+    # Each lookup is a range scan on a (key, version) index
+    programs = db.scalars(
+        select(Program).where(
+            Program.id.in_(program_ids),
+            or_(Program.version > cursor.catalog_version, Program.id.in_(new_program_ids))
+        )
+    ).all()
+    activities = db.scalars(
+        select(Activity).where(
+            Activity.program_id.in_(program_ids),
+            or_(Activity.version > cursor.catalog_version, Activity.program_id.in_(new_program_ids))
+        )
+    ).all()
+    # Archived completions keep their version, so a full sync still returns them
+    history = completion_history(user_id)
+    completions = db.execute(select(history).where(history.c.version > user_since)).all()
+    
+    # Programs resent for a new enrollment can be older than the cursor, hence the cursor's own version
+    catalog_version = max([cursor.catalog_version] + [row.version for row in [*programs, *activities]])
+    user_version = max(
+        [user_since] + [row.version for row in completions] + [enrollment.enrolled_version for enrollment in enrollments]
+    )
+    return SyncFeed(
+        cursor=encode_cursor(SyncCursor(catalog_version, session_shard_tag(db), user_version)),
+        programs=programs,
+        activities=activities,
+        completions=completions
+    )
+
+# Program funnel and retention analytics
+@router.get("/programs/{program_id}/analytics", response_model=ProgramAnalytics)
+def get_program_analytics(program_id: int, db: Session = Depends(get_db)):
+    program = db.get(Program, program_id)
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+
+    duration_days = program.duration_days or 30
+    # Users live on exactly one shard, so per-shard matrices stack into the full one
+    with user_sessions(db) as sessions:
+        matrix = np.vstack([load_completion_matrix(user_db, program_id, duration_days)[1] for user_db in sessions])
+    activities_per_day = load_activities_per_day(db, program_id, duration_days)
+
+    return ProgramAnalytics(program_id=program_id, **compute_program_metrics(matrix, activities_per_day))
+
+# Daily aggregates, read from the rollup tables maintained by run_rollups
+@router.get("/programs/{program_id}/daily-stats", response_model=ProgramDailyStats)
+def get_program_daily_stats(
+    program_id: int,
+    start: date_type = Query(..., description="First day (YYYY-MM-DD)"),
+    end: date_type = Query(..., description="Last day (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
+):
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    
+    days = db.scalars(
+        select(DailyProgramRollup).where(
+            DailyProgramRollup.program_id == program_id,
+            DailyProgramRollup.day >= start,
+            DailyProgramRollup.day <= end
+        ).order_by(DailyProgramRollup.day)
+    ).all()
+    categories = db.execute(
+        select(
+            DailyCategoryRollup.category,
+            func.sum(DailyCategoryRollup.completions),
+            func.sum(DailyCategoryRollup.minutes)
+        ).where(
+            DailyCategoryRollup.program_id == program_id,
+            DailyCategoryRollup.day >= start,
+            DailyCategoryRollup.day <= end
+        ).group_by(DailyCategoryRollup.category).order_by(DailyCategoryRollup.category)
+    ).all()
+    
+    return ProgramDailyStats(
+        program_id=program_id,
+        start=start,
+        end=end,
+        days=[DailyProgramStats.model_validate(day) for day in days],
+        categories=[
+            CategoryStats(category=category, completions=completions, minutes=minutes)
+            for category, completions, minutes in categories
+        ]
+    )
+
+# Completion history exports
+def _export_response(sessions: List[Session], stmt, export_format: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_completion_export(sessions, stmt, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+@router.get("/users/{user_id}/completions/export")
+def export_user_completions(
+    user_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format: ndjson or csv"),
+    db: Session = Depends(get_user_db)
+):
+    stmt = completion_export_query(user_id=user_id)
+    return _export_response([db], stmt, format, f"user-{user_id}-completions")
+
+@router.get("/programs/{program_id}/completions/export")
+def export_program_completions(
+    program_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format: ndjson or csv"),
+    db: Session = Depends(get_db)
+):
+    stmt = completion_export_query(program_id=program_id)
+    # Fans out over every shard; rows are ordered by id within each shard
+    return _export_response(open_user_sessions(db), stmt, format, f"program-{program_id}-completions")
@@ -0,0 +1,58 @@
+import os
+
+DATABASE_URL = os.getenv("PRODIGY_DATABASE_URL", "sqlite:///./prodigy.db")
+
+# Comma-separated database URLs for user-scoped tables, e.g.
+# "sqlite:///./shard0.db,sqlite:///./shard1.db". Empty keeps everything in DATABASE_URL.
+SHARD_URLS = [url.strip() for url in os.getenv("PRODIGY_SHARD_URLS", "").split(",") if url.strip()]
+
+# PostgreSQL (psycopg 3): executions of the same statement on a connection before it is
+# prepared server-side. psycopg2 has no server-side prepare, so this needs postgresql+psycopg.
+PG_PREPARE_THRESHOLD = int(os.getenv("PRODIGY_PG_PREPARE_THRESHOLD", "1"))
+
+# Seconds between in-process rollup runs; 0 disables the scheduler (run run_rollups.py from cron instead)
+ROLLUP_INTERVAL_SECONDS = float(os.getenv("PRODIGY_ROLLUP_INTERVAL_SECONDS", "0"))
+# File the workers flock to pick the one that runs scheduled rollups; must be on a local filesystem
+ROLLUP_LOCK_PATH = os.getenv("PRODIGY_ROLLUP_LOCK_PATH", "/tmp/prodigy-rollups.lock")
+
+# Admission control: concurrent requests per route class, how many may wait for a
+# slot, and how long they may wait before being shed with 503 + Retry-After
+READ_CONCURRENCY = int(os.getenv("PRODIGY_READ_CONCURRENCY", "32"))
+READ_QUEUE_SIZE = int(os.getenv("PRODIGY_READ_QUEUE_SIZE", "64"))
+WRITE_CONCURRENCY = int(os.getenv("PRODIGY_WRITE_CONCURRENCY", "4"))
+WRITE_QUEUE_SIZE = int(os.getenv("PRODIGY_WRITE_QUEUE_SIZE", "32"))
+# Streaming exports hold a slot for the whole download, so they get a small class of their own
+EXPORT_CONCURRENCY = int(os.getenv("PRODIGY_EXPORT_CONCURRENCY", "2"))
+EXPORT_QUEUE_SIZE = int(os.getenv("PRODIGY_EXPORT_QUEUE_SIZE", "4"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PRODIGY_ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+RETRY_AFTER_SECONDS = int(os.getenv("PRODIGY_RETRY_AFTER_SECONDS", "1"))
+
+# Per-request profiling: requests sending this token in the X-Profile header are run under
+# cProfile and tracemalloc with their SQL recorded. Empty (the default) leaves it out entirely.
+PROFILING_TOKEN = os.getenv("PRODIGY_PROFILING_TOKEN", "")
+PROFILE_HISTORY_SIZE = int(os.getenv("PRODIGY_PROFILE_HISTORY_SIZE", "50"))
+
+# Seconds a request waits on an identical in-flight read (see app.utils.singleflight) before giving up
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("PRODIGY_SINGLE_FLIGHT_TIMEOUT_SECONDS", "5"))
+
+# Memory-mapped catalog snapshot shared by all workers (see app.database.snapshot). Empty disables it.
+# Changes made by other processes show up after at most CATALOG_SNAPSHOT_REFRESH_SECONDS.
+CATALOG_SNAPSHOT_PATH = os.getenv("PRODIGY_CATALOG_SNAPSHOT_PATH", "")
+CATALOG_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("PRODIGY_CATALOG_SNAPSHOT_REFRESH_SECONDS", "30"))
+
+# Idempotency-Key replay for retried writes: "memory" (per process), "database" (shared) or "off"
+IDEMPOTENCY_BACKEND = os.getenv("PRODIGY_IDEMPOTENCY_BACKEND", "memory")
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("PRODIGY_IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("PRODIGY_IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# How long a key stays claimed by a request that never finished (its worker died) before a retry may take it over
+IDEMPOTENCY_PENDING_SECONDS = float(os.getenv("PRODIGY_IDEMPOTENCY_PENDING_SECONDS", "60"))
+
+# Production launcher (python -m app.launcher). WORKERS=0 runs one worker per available CPU;
+# workers restart after MAX_REQUESTS plus up to MAX_REQUESTS_JITTER requests (0 disables recycling).
+HOST = os.getenv("PRODIGY_HOST", "0.0.0.0")
+PORT = int(os.getenv("PRODIGY_PORT", "8000"))
+WORKERS = int(os.getenv("PRODIGY_WORKERS", os.getenv("WEB_CONCURRENCY", "0")))
+MAX_REQUESTS = int(os.getenv("PRODIGY_MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("PRODIGY_MAX_REQUESTS_JITTER", "1000"))
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("PRODIGY_GRACEFUL_TIMEOUT_SECONDS", "30"))
+WORKER_TIMEOUT_SECONDS = int(os.getenv("PRODIGY_WORKER_TIMEOUT_SECONDS", "60"))
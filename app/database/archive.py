@@ -0,0 +1,99 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Set, Tuple
+
+from sqlalchemy import delete, insert, select, union_all
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Subquery
+
+from app.models.models import Activity, ArchivedActivityCompletion, Program, UserActivityCompletion, UserProgress
+
+logger = logging.getLogger(__name__)
+
+# Completions moved per transaction, keeping each write lock short
+ARCHIVE_BATCH_SIZE = 500
+
+# Completions younger than this stay in the hot table, so reads of recent dates can skip the archive
+ARCHIVE_MIN_AGE = timedelta(days=30)
+
+ARCHIVED_COLUMNS = ["id", "user_id", "activity_id", "completed_at", "completion_date", "updated_at", "version"]
+
+def completion_history(user_id=None) -> Subquery:
+    """Hot and archived completions as one selectable, for historical reads.
+
+    `user_id` is an id or a bindparam (for statements built once and reused).
+    """
+    hot = select(*(getattr(UserActivityCompletion, column) for column in ARCHIVED_COLUMNS))
+    archived = select(*(getattr(ArchivedActivityCompletion, column) for column in ARCHIVED_COLUMNS))
+    if user_id is not None:
+        # Filter inside each branch so both tables can use their user_id indexes
+        hot = hot.where(UserActivityCompletion.user_id == user_id)
+        archived = archived.where(ArchivedActivityCompletion.user_id == user_id)
+    return union_all(hot, archived).subquery("completion_history")
+
+def archive_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Completions dated on or after this are never archived"""
+    return (now or datetime.now()) - ARCHIVE_MIN_AGE
+
+def find_finished_enrollments(db: Session, now: datetime) -> Set[Tuple[int, int]]:
+    """(user_id, program_id) pairs whose enrollments are all inactive or past their duration"""
+    finished, active = set(), set()
+    rows = db.execute(
+        select(UserProgress.user_id, UserProgress.program_id, UserProgress.start_date,
+               UserProgress.is_active, Program.duration_days)
+        .join(Program, Program.id == UserProgress.program_id)
+        .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+    )
+    for user_id, program_id, start_date, is_active, duration_days in rows:
+        ended = start_date is not None and start_date + timedelta(days=duration_days or 30) <= now
+        if is_active and not ended:
+            active.add((user_id, program_id))
+        else:
+            finished.add((user_id, program_id))
+    # A user who re-enrolled still needs their completions in the hot table
+    return finished - active
+
+def archive_enrollment(db: Session, user_id: int, program_id: int, before: datetime,
+                       batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move one enrollment's completions dated before `before` to the archive in batches, committing after each"""
+    moved = 0
+    while True:
+        ids = db.scalars(
+            select(UserActivityCompletion.id)
+            .join(Activity, Activity.id == UserActivityCompletion.activity_id)
+            .where(
+                UserActivityCompletion.user_id == user_id,
+                Activity.program_id == program_id,
+                UserActivityCompletion.completion_date < before
+            )
+            .order_by(UserActivityCompletion.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return moved
+        try:
+            db.execute(
+                insert(ArchivedActivityCompletion).from_select(
+                    ARCHIVED_COLUMNS,
+                    select(*(getattr(UserActivityCompletion, column) for column in ARCHIVED_COLUMNS))
+                    .where(UserActivityCompletion.id.in_(ids))
+                )
+            )
+            db.execute(delete(UserActivityCompletion).where(UserActivityCompletion.id.in_(ids)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        moved += len(ids)
+
+def archive_finished_enrollments(db: Session, now: Optional[datetime] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Archive completions for every finished enrollment and return how many rows moved"""
+    now = now or datetime.now()
+    before = archive_cutoff(now)
+    total = 0
+    for user_id, program_id in sorted(find_finished_enrollments(db, now)):
+        moved = archive_enrollment(db, user_id, program_id, before, batch_size)
+        if moved:
+            logger.info("Archived %d completions for user %d in program %d", moved, user_id, program_id)
+        total += moved
+    return total
@@ -0,0 +1,47 @@
+"""Lightweight read-side records.
+
+Read endpoints only copy column values into responses, so they get plain
+tuple-backed records instead of ORM instances: no identity map, change
+tracking or relationship proxies to build per row. Field names match the
+model attributes, so builders and from_attributes schemas accept either.
+The ORM models remain the way to write.
+"""
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.models import Activity, Program, UserProgress
+
+class ActivityRecord(NamedTuple):
+    id: int
+    program_id: int
+    title: str
+    description: Optional[str]
+    day_number: int
+    duration_minutes: int
+    category: Optional[str]
+
+class ProgressRecord(NamedTuple):
+    id: int
+    user_id: int
+    program_id: int
+    start_date: datetime
+    current_day: int
+    is_active: bool
+    completion_mask: int
+    duration_days: Optional[int]  # From the program, so callers need no second lookup
+
+class CompletionRecord(NamedTuple):
+    id: int
+    user_id: int
+    activity_id: int
+    completed_at: datetime
+    completion_date: datetime
+
+def _columns(model, fields) -> List[ColumnElement]:
+    return [getattr(model, field) for field in fields]
+
+# Select lists in record field order
+ACTIVITY_RECORD_COLUMNS = _columns(Activity, ActivityRecord._fields)
+PROGRESS_RECORD_COLUMNS = _columns(UserProgress, ProgressRecord._fields[:-1]) + [Program.duration_days]
@@ -0,0 +1,176 @@
+"""Hot read queries, built once per process.
+
+Each statement is constructed at import time with bind parameters, so requests
+only bind values; SQLAlchemy's compiled cache then reuses the compiled SQL.
+Statements select columns rather than entities and results come back as the
+records in app.database.records, so reads never hydrate ORM instances.
+"""
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.database.archive import archive_cutoff, completion_history
+from app.database.records import (
+    ACTIVITY_RECORD_COLUMNS, PROGRESS_RECORD_COLUMNS,
+    ActivityRecord, CompletionRecord, ProgressRecord
+)
+from app.models.models import Activity, Program, UserActivityCompletion, UserProgress
+
+_active_progress = (
+    select(*PROGRESS_RECORD_COLUMNS)
+    .outerjoin(Program, Program.id == UserProgress.program_id)
+    .where(
+        UserProgress.user_id == bindparam("user_id"),
+        UserProgress.program_id == bindparam("program_id"),
+        UserProgress.is_active == True
+    )
+    .limit(1)
+)
+
+_activity_by_id = select(*ACTIVITY_RECORD_COLUMNS).where(Activity.id == bindparam("activity_id"))
+
+_activities_for_days = (
+    select(*ACTIVITY_RECORD_COLUMNS)
+    .where(
+        Activity.program_id == bindparam("program_id"),
+        Activity.day_number >= bindparam("first_day"),
+        Activity.day_number <= bindparam("last_day")
+    )
+    .order_by(Activity.day_number, Activity.id)
+)
+
+_activities_for_program = (
+    select(*ACTIVITY_RECORD_COLUMNS)
+    .where(Activity.program_id == bindparam("program_id"))
+    .order_by(Activity.day_number, Activity.id)
+)
+
+# Column-limited variants for `fields=` requests, built once per distinct column set
+_activity_columns: Dict[Tuple[FrozenSet[str], bool], Select] = {}
+_program_columns: Dict[Tuple[FrozenSet[str], bool], Select] = {}
+_program_activity_columns: Dict[FrozenSet[str], Select] = {}
+
+_activity_count_through_day = select(func.count(Activity.id)).where(
+    Activity.program_id == bindparam("program_id"),
+    Activity.day_number <= bindparam("day_number")
+)
+
+def _completions_in_range_from(completions) -> Select:
+    return (
+        select(*(completions.c[field] for field in CompletionRecord._fields))
+        .where(
+            completions.c.user_id == bindparam("user_id"),
+            completions.c.completion_date >= bindparam("start"),
+            completions.c.completion_date < bindparam("end")
+        )
+        .order_by(completions.c.completion_date, completions.c.id)
+    )
+
+def _completion_for_activity_from(completions) -> Select:
+    return (
+        select(completions.c.id)
+        .where(
+            completions.c.user_id == bindparam("user_id"),
+            completions.c.activity_id == bindparam("activity_id"),
+            completions.c.completion_date >= bindparam("start"),
+            completions.c.completion_date < bindparam("end")
+        )
+        .limit(1)
+    )
+
+# Ranges reaching back before the archive cutoff read the hot and archived tables, so finished
+# enrollments read the same; newer ranges cannot have archived rows and read the hot table alone
+_history = completion_history(bindparam("user_id"))
+_hot = UserActivityCompletion.__table__
+
+_completions_in_range = _completions_in_range_from(_history)
+_hot_completions_in_range = _completions_in_range_from(_hot)
+
+_completion_for_activity = _completion_for_activity_from(_history)
+_hot_completion_for_activity = _completion_for_activity_from(_hot)
+
+def get_active_progress(db: Session, user_id: int, program_id: int) -> Optional[ProgressRecord]:
+    row = db.execute(_active_progress, {"user_id": user_id, "program_id": program_id}).first()
+    return ProgressRecord._make(row) if row else None
+
+def get_activity(db: Session, activity_id: int) -> Optional[ActivityRecord]:
+    row = db.execute(_activity_by_id, {"activity_id": activity_id}).first()
+    return ActivityRecord._make(row) if row else None
+
+def get_activities_for_days(db: Session, program_id: int, first_day: int, last_day: int) -> List[ActivityRecord]:
+    rows = db.execute(
+        _activities_for_days, {"program_id": program_id, "first_day": first_day, "last_day": last_day}
+    )
+    return list(map(ActivityRecord._make, rows))
+
+def get_activities_for_day(db: Session, program_id: int, day_number: int) -> List[ActivityRecord]:
+    return get_activities_for_days(db, program_id, day_number, day_number)
+
+def count_activities_through_day(db: Session, program_id: int, day_number: int) -> int:
+    return db.scalar(_activity_count_through_day, {"program_id": program_id, "day_number": day_number})
+
+def get_completions_in_range(db: Session, user_id: int, start: datetime, end: datetime) -> List[CompletionRecord]:
+    """The user's completions with start <= completion_date < end"""
+    statement = _completions_in_range if start < archive_cutoff() else _hot_completions_in_range
+    rows = db.execute(statement, {"user_id": user_id, "start": start, "end": end})
+    return list(map(CompletionRecord._make, rows))
+
+def completion_exists(db: Session, user_id: int, activity_id: int, start: datetime, end: datetime) -> bool:
+    params = {"user_id": user_id, "activity_id": activity_id, "start": start, "end": end}
+    statement = _completion_for_activity if start < archive_cutoff() else _hot_completion_for_activity
+    return db.scalar(statement, params) is not None
+
+def _activity_columns_statement(columns: Sequence[str], by_days: bool):
+    key = (frozenset(columns) | {"id", "day_number"}, by_days)
+    stmt = _activity_columns.get(key)
+    if stmt is None:
+        stmt = select(*(getattr(Activity, column) for column in sorted(key[0]))).where(
+            Activity.program_id == bindparam("program_id")
+        )
+        if by_days:
+            stmt = stmt.where(
+                Activity.day_number >= bindparam("first_day"),
+                Activity.day_number <= bindparam("last_day")
+            )
+        stmt = stmt.order_by(Activity.day_number, Activity.id)
+        _activity_columns[key] = stmt
+    return stmt
+
+def get_activities_for_program(db: Session, program_id: int) -> List[ActivityRecord]:
+    return list(map(ActivityRecord._make, db.execute(_activities_for_program, {"program_id": program_id})))
+
+def get_activity_rows_for_days(db: Session, program_id: int, first_day: int, last_day: int, columns: Sequence[str]):
+    """Like get_activities_for_days, but reads only `columns` (plus id and day_number) as plain rows"""
+    stmt = _activity_columns_statement(columns, by_days=True)
+    return db.execute(stmt, {"program_id": program_id, "first_day": first_day, "last_day": last_day}).all()
+
+def get_activity_rows_for_program(db: Session, program_id: int, columns: Sequence[str]):
+    stmt = _activity_columns_statement(columns, by_days=False)
+    return db.execute(stmt, {"program_id": program_id}).all()
+
+def get_activity_rows_for_programs(db: Session, program_ids: Sequence[int], columns: Sequence[str]):
+    """Activities of several programs as plain rows holding only `columns` (plus program_id, id and day_number)"""
+    key = frozenset(columns) | {"program_id", "id", "day_number"}
+    stmt = _program_activity_columns.get(key)
+    if stmt is None:
+        stmt = (
+            select(*(getattr(Activity, column) for column in sorted(key)))
+            .where(Activity.program_id.in_(bindparam("program_ids", expanding=True)))
+            .order_by(Activity.day_number, Activity.id)
+        )
+        _program_activity_columns[key] = stmt
+    return db.execute(stmt, {"program_ids": list(program_ids)}).all()
+
+def get_program_rows(db: Session, columns: Sequence[str], program_id: Optional[int] = None):
+    """Programs as plain rows holding only `columns` (plus id); all programs when program_id is None"""
+    key = (frozenset(columns) | {"id"}, program_id is not None)
+    stmt = _program_columns.get(key)
+    if stmt is None:
+        stmt = select(*(getattr(Program, column) for column in sorted(key[0]))).order_by(Program.id)
+        if program_id is not None:
+            stmt = stmt.where(Program.id == bindparam("program_id"))
+        _program_columns[key] = stmt
+    return db.execute(stmt, {"program_id": program_id} if program_id is not None else {}).all()
@@ -0,0 +1,225 @@
+import fcntl
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database.archive import completion_history
+from app.database.sharding import UNSHARDED_TAG, session_shard_tag, user_sessions
+from app.models.models import (
+    Activity, ArchivedActivityCompletion, DailyCategoryRollup, DailyProgramRollup, RollupState, UserActivityCompletion
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "daily_completions"
+
+def _as_date(value) -> date:
+    # func.date() returns a string on SQLite and a date on PostgreSQL
+    return date.fromisoformat(str(value)[:10])
+
+def _max_version(db: Session) -> int:
+    """Highest completion version in one database; per table, so each is a single index lookup"""
+    return max(
+        db.scalar(select(func.max(UserActivityCompletion.version))) or 0,
+        db.scalar(select(func.max(ArchivedActivityCompletion.version))) or 0,
+    )
+
+def _touched_days(db: Session, low: int, high: int) -> Dict[int, Set[date]]:
+    """Program days that received completions with versions in (low, high]"""
+    history = completion_history()
+    completion_day = func.date(history.c.completion_date)
+    rows = db.execute(
+        select(Activity.program_id, completion_day)
+        .join(Activity, Activity.id == history.c.activity_id)
+        .where(history.c.version > low, history.c.version <= high)
+        .group_by(Activity.program_id, completion_day)
+    )
+    touched = defaultdict(set)
+    for program_id, day in rows:
+        touched[program_id].add(_as_date(day))
+    return touched
+
+def _program_day_totals(db: Session, program_id: int, days: Set[date]):
+    """Per-day and per-(day, category) totals from one database's completions"""
+    history = completion_history()
+    completion_day = func.date(history.c.completion_date)
+    # Plain ranges on completion_date, so both tables can use their completion_date indexes
+    day_ranges = [
+        and_(history.c.completion_date >= start, history.c.completion_date < start + timedelta(days=1))
+        for start in (datetime.combine(day, time.min) for day in sorted(days))
+    ]
+    base = (
+        select()
+        .select_from(history)
+        .join(Activity, Activity.id == history.c.activity_id)
+        .where(Activity.program_id == program_id, or_(*day_ranges))
+    )
+
+    program_rows = db.execute(
+        base.add_columns(
+            completion_day,
+            func.count(),
+            func.count(history.c.user_id.distinct()),
+            func.coalesce(func.sum(Activity.duration_minutes), 0)
+        ).group_by(completion_day)
+    ).all()
+    category_rows = db.execute(
+        base.add_columns(
+            completion_day,
+            func.coalesce(Activity.category, ""),
+            func.count(),
+            func.coalesce(func.sum(Activity.duration_minutes), 0)
+        ).group_by(completion_day, func.coalesce(Activity.category, ""))
+    ).all()
+    return program_rows, category_rows
+
+def _recompute_program_days(db: Session, user_dbs: List[Session], program_id: int, days: Set[date]) -> None:
+    """Replace the rollup rows for the given program days with fresh totals.
+
+    Totals from each user shard are added together; a user lives on exactly one
+    shard, so per-shard distinct user counts add up as well.
+    """
+    program_totals = defaultdict(lambda: [0, 0, 0])
+    category_totals = defaultdict(lambda: [0, 0])
+    for user_db in user_dbs:
+        program_rows, category_rows = _program_day_totals(user_db, program_id, days)
+        for day, completions, active_users, minutes in program_rows:
+            totals = program_totals[_as_date(day)]
+            totals[0] += completions
+            totals[1] += active_users
+            totals[2] += minutes
+        for day, category, completions, minutes in category_rows:
+            totals = category_totals[(_as_date(day), category)]
+            totals[0] += completions
+            totals[1] += minutes
+
+    db.execute(delete(DailyProgramRollup).where(
+        DailyProgramRollup.program_id == program_id, DailyProgramRollup.day.in_(days)
+    ))
+    db.execute(delete(DailyCategoryRollup).where(
+        DailyCategoryRollup.program_id == program_id, DailyCategoryRollup.day.in_(days)
+    ))
+    if program_totals:
+        db.execute(insert(DailyProgramRollup), [
+            {"program_id": program_id, "day": day, "completions": completions,
+             "active_users": active_users, "minutes": minutes}
+            for day, (completions, active_users, minutes) in program_totals.items()
+        ])
+    if category_totals:
+        db.execute(insert(DailyCategoryRollup), [
+            {"program_id": program_id, "day": day, "category": category,
+             "completions": completions, "minutes": minutes}
+            for (day, category), (completions, minutes) in category_totals.items()
+        ])
+
+def _state_name(user_db: Session) -> str:
+    # Each shard versions its completions with its own counter, so each keeps its own mark
+    tag = session_shard_tag(user_db)
+    return ROLLUP_NAME if tag == UNSHARDED_TAG else f"{ROLLUP_NAME}:{tag}"
+
+def run_rollups(db: Session, user_dbs: Optional[List[Session]] = None) -> int:
+    """Roll up completions added since the last run; returns the number of program days refreshed.
+
+    Completion versions are handed out in commit order (see versioning), so
+    everything at or below the current maximum is already committed and the
+    maximum is a safe new high-water mark. `user_dbs` are the sessions holding
+    completions (one per shard, each with its own counter and mark); by default
+    completions are read from `db`.
+    """
+    user_dbs = user_dbs or [db]
+    marks = {}
+    touched = defaultdict(set)
+    for user_db in user_dbs:
+        name = _state_name(user_db)
+        state = db.get(RollupState, name)
+        low = state.high_water_mark if state else 0
+        high = _max_version(user_db)
+        if high <= low:
+            continue
+        marks[name] = (state, high)
+        for program_id, days in _touched_days(user_db, low, high).items():
+            touched[program_id] |= days
+    if not marks:
+        return 0
+
+    refreshed = 0
+    try:
+        for program_id, days in touched.items():
+            _recompute_program_days(db, user_dbs, program_id, days)
+            refreshed += len(days)
+        for name, (state, high) in marks.items():
+            if state is None:
+                db.add(RollupState(name=name, high_water_mark=high))
+            else:
+                state.high_water_mark = high
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(
+        "Rolled up completions through %s (%d program days refreshed)",
+        ", ".join(f"{name}={high}" for name, (_, high) in marks.items()), refreshed
+    )
+    return refreshed
+
+class RollupScheduler:
+    """Runs run_rollups on a fixed interval in a background thread.
+
+    With `lock_path`, only the process holding an exclusive flock on that file
+    runs rollups; every worker starts a scheduler, one of them wins the lock and
+    keeps it until it exits, and another takes over on its next tick.
+    """
+
+    def __init__(self, session_factory: sessionmaker, interval_seconds: float, lock_path: Optional[str] = None):
+        self._session_factory = session_factory
+        self._interval = interval_seconds
+        self._lock_path = lock_path
+        self._lock_file = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="rollup-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        if self._lock_file:
+            # Closing the file releases the lock for the next leader
+            self._lock_file.close()
+            self._lock_file = None
+
+    def is_leader(self) -> bool:
+        """Whether this process runs the rollups, taking the lock if it is free"""
+        if self._lock_path is None or self._lock_file is not None:
+            return True
+        lock_file = open(self._lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info("Running scheduled rollups in this process (pid %d)", os.getpid())
+        return True
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            if not self.is_leader():
+                continue
+            db = self._session_factory()
+            try:
+                with user_sessions(db) as user_dbs:
+                    run_rollups(db, user_dbs)
+            except Exception:
+                logger.exception("Rollup run failed")
+            finally:
+                db.close()
@@ -0,0 +1,143 @@
+import re
+from typing import List
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+# SQLite keeps one FTS5 table for programs and activities. Rowids are derived
+# from the source primary key (programs even, activities odd) so the sync
+# triggers can update and delete entries by rowid instead of scanning.
+SQLITE_SEARCH_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    kind UNINDEXED, ref_id UNINDEXED, program_id UNINDEXED,
+    title, body, category,
+    tokenize = 'porter unicode61'
+)
+"""
+
+SQLITE_PROGRAM_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS programs_search_ai AFTER INSERT ON programs BEGIN
+        INSERT INTO search_index (rowid, kind, ref_id, program_id, title, body, category)
+        VALUES (new.id * 2, 'program', new.id, new.id, new.name, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS programs_search_au AFTER UPDATE ON programs BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+        INSERT INTO search_index (rowid, kind, ref_id, program_id, title, body, category)
+        VALUES (new.id * 2, 'program', new.id, new.id, new.name, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS programs_search_ad AFTER DELETE ON programs BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END
+    """,
+]
+
+SQLITE_ACTIVITY_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS activities_search_ai AFTER INSERT ON activities BEGIN
+        INSERT INTO search_index (rowid, kind, ref_id, program_id, title, body, category)
+        VALUES (new.id * 2 + 1, 'activity', new.id, new.program_id, new.title, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS activities_search_au AFTER UPDATE ON activities BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+        INSERT INTO search_index (rowid, kind, ref_id, program_id, title, body, category)
+        VALUES (new.id * 2 + 1, 'activity', new.id, new.program_id, new.title, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS activities_search_ad AFTER DELETE ON activities BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+# PostgreSQL computes the documents from the source rows, so GIN expression
+# indexes stay in sync without triggers.
+POSTGRES_PROGRAM_DOCUMENT = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))"
+POSTGRES_ACTIVITY_DOCUMENT = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(category, ''))"
+)
+
+POSTGRES_INDEXES = {
+    "programs": f"CREATE INDEX IF NOT EXISTS ix_programs_search ON programs USING GIN ({POSTGRES_PROGRAM_DOCUMENT})",
+    "activities": f"CREATE INDEX IF NOT EXISTS ix_activities_search ON activities USING GIN ({POSTGRES_ACTIVITY_DOCUMENT})",
+}
+
+def create_search_index(connection: Connection, table_name: str) -> None:
+    """Create the search structures that belong to `programs` or `activities`"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        connection.exec_driver_sql(SQLITE_SEARCH_TABLE)
+        triggers = SQLITE_PROGRAM_TRIGGERS if table_name == "programs" else SQLITE_ACTIVITY_TRIGGERS
+        for trigger in triggers:
+            connection.exec_driver_sql(trigger)
+    elif dialect == "postgresql":
+        connection.exec_driver_sql(POSTGRES_INDEXES[table_name])
+
+def rebuild_search_index(connection: Connection) -> None:
+    """Repopulate the SQLite index from the source tables (no-op elsewhere)"""
+    if connection.dialect.name != "sqlite":
+        return
+    connection.exec_driver_sql("DELETE FROM search_index")
+    connection.exec_driver_sql(
+        "INSERT INTO search_index (rowid, kind, ref_id, program_id, title, body, category) "
+        "SELECT id * 2, 'program', id, id, name, description, '' FROM programs"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO search_index (rowid, kind, ref_id, program_id, title, body, category) "
+        "SELECT id * 2 + 1, 'activity', id, program_id, title, description, category FROM activities"
+    )
+
+def register_search_index(*tables) -> None:
+    """Create each table's search structures right after the table itself"""
+    for table in tables:
+        event.listen(table, "after_create", lambda target, connection, **kw: create_search_index(connection, target.name))
+
+def _fts5_query(query: str) -> str:
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{term}"*' for term in terms)
+
+def search_catalog(db: Session, query: str, limit: int, offset: int) -> List[dict]:
+    """Ranked search over program names/descriptions and activity titles/descriptions/categories"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = text(f"""
+            SELECT kind, ref_id, program_id, title, rank FROM (
+                SELECT 'program' AS kind, id AS ref_id, id AS program_id, name AS title,
+                       ts_rank({POSTGRES_PROGRAM_DOCUMENT}, websearch_to_tsquery('english', :q)) AS rank
+                FROM programs WHERE {POSTGRES_PROGRAM_DOCUMENT} @@ websearch_to_tsquery('english', :q)
+                UNION ALL
+                SELECT 'activity', id, program_id, title,
+                       ts_rank({POSTGRES_ACTIVITY_DOCUMENT}, websearch_to_tsquery('english', :q))
+                FROM activities WHERE {POSTGRES_ACTIVITY_DOCUMENT} @@ websearch_to_tsquery('english', :q)
+            ) AS matches
+            ORDER BY rank DESC, kind, ref_id
+            LIMIT :limit OFFSET :offset
+        """)
+        params = {"q": query, "limit": limit, "offset": offset}
+    else:
+        match = _fts5_query(query)
+        if not match:
+            return []
+        # bm25() is lower-is-better; titles weigh more than categories, which weigh more than bodies
+        stmt = text("""
+            SELECT kind, ref_id, program_id, title, -bm25(search_index, 0, 0, 0, 10.0, 1.0, 2.0) AS rank
+            FROM search_index
+            WHERE search_index MATCH :q
+            ORDER BY bm25(search_index, 0, 0, 0, 10.0, 1.0, 2.0), rowid
+            LIMIT :limit OFFSET :offset
+        """)
+        params = {"q": match, "limit": limit, "offset": offset}
+
+    return [
+        {"kind": kind, "id": ref_id, "program_id": program_id, "title": title, "rank": float(rank)}
+        for kind, ref_id, program_id, title, rank in db.execute(stmt, params)
+    ]
@@ -0,0 +1,205 @@
+"""Hash-sharded storage for user-scoped tables.
+
+UserProgress, UserActivityCompletion and the completion archive live in one of N
+shard databases chosen from the user id; everything else (programs, activities,
+users, rollups) stays in the catalog database. Each shard also has its own sync
+counter, so versioning user rows never writes to the catalog; a shard's tag
+(derived from its location) tells sync cursors from different shards apart.
+
+SQLite shards ATTACH the catalog on connect, so unqualified queries that join
+user rows with programs and activities keep working on a shard session. Other
+backends must replicate CATALOG_TABLES_ON_SHARDS into each shard (see README).
+
+While rebalance_shards.py moves users it keeps a row in the catalog's
+shard_rebalance table, and every helper here refuses user rows with 503 until
+the move has finished and this process runs the new shard list.
+
+Sharding is off unless PRODIGY_SHARD_URLS is set; every helper then falls back
+to the single request session.
+"""
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import DATABASE_URL, RETRY_AFTER_SECONDS, SHARD_URLS
+from app.database.database import Base, get_db
+
+USER_SCOPED_TABLES = ["user_progress", "user_activity_completions", "user_activity_completions_archive"]
+# Per-shard tables without user rows; unqualified names resolve to these before the attached catalog's
+SHARD_LOCAL_TABLES = ["sync_counter"]
+# Catalog tables that shard queries join with user rows
+CATALOG_TABLES_ON_SHARDS = ["programs", "activities"]
+
+UNSHARDED_TAG = 0
+# A shard's new user rows get ids in [tag << SHARD_ID_BITS, (tag + 1) << SHARD_ID_BITS), so they keep them when moved
+SHARD_ID_BITS = 40
+
+def shard_index(user_id: int, shard_count: int) -> int:
+    """Stable shard number for a user (the same in every process and release)"""
+    return zlib.crc32(str(user_id).encode()) % shard_count
+
+def shard_tag(url: str) -> int:
+    """Stable 1..32768 tag for the shard at `url`; credentials do not affect it"""
+    parsed = make_url(url)
+    location = f"{parsed.host or ''}:{parsed.port or ''}/{parsed.database or ''}"
+    return (zlib.crc32(location.encode()) & 0x7FFF) + 1
+
+def session_shard_tag(db: Session) -> int:
+    """Tag of the shard `db` is bound to, or UNSHARDED_TAG for the catalog session"""
+    return db.info.get("shard_tag", UNSHARDED_TAG)
+
+def shard_id_base(tag: int) -> int:
+    return tag << SHARD_ID_BITS
+
+def session_id_base(db: Session) -> Optional[int]:
+    """First id of the shard's range, or None when ids are left to the database"""
+    return db.info.get("id_base")
+
+def format_shard_tags(tags: List[int]) -> str:
+    return ",".join(str(tag) for tag in tags)
+
+def _create_shard_engine(url: str, catalog_url: str) -> Engine:
+    if not url.startswith("sqlite"):
+        return create_engine(url)
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    catalog_path = make_url(catalog_url).database
+
+    @event.listens_for(engine, "connect")
+    def attach_catalog(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ? AS catalog", (catalog_path,))
+
+    return engine
+
+def _seed_sync_counter(connection) -> None:
+    """Start a new shard counter above versions already stored in the shard.
+
+    Rows moved in before shards had counters of their own carry catalog versions.
+    """
+    counter = Base.metadata.tables["sync_counter"]
+    if connection.scalar(select(counter.c.value).where(counter.c.id == 1)) is not None:
+        return
+    completions = Base.metadata.tables["user_activity_completions"]
+    archive = Base.metadata.tables["user_activity_completions_archive"]
+    progress = Base.metadata.tables["user_progress"]
+    highest = max(
+        connection.scalar(select(func.max(completions.c.version))) or 0,
+        connection.scalar(select(func.max(archive.c.version))) or 0,
+        connection.scalar(select(func.max(progress.c.enrolled_version))) or 0,
+    )
+    connection.execute(insert(counter).values(id=1, value=highest))
+
+class ShardRouter:
+    def __init__(self, shard_urls: List[str], catalog_url: str = DATABASE_URL):
+        if not shard_urls:
+            raise ValueError("At least one shard URL is required")
+        self.shard_urls = list(shard_urls)
+        self.catalog_url = catalog_url
+        self.tags = [shard_tag(url) for url in self.shard_urls]
+        if len(set(self.tags)) != len(self.tags):
+            raise ValueError("Shard URLs must point at distinct databases with distinct tags")
+        self.engines = [_create_shard_engine(url, catalog_url) for url in self.shard_urls]
+        self._sessionmakers = [
+            sessionmaker(autocommit=False, autoflush=False, bind=engine, info={"shard_tag": tag, "id_base": shard_id_base(tag)})
+            for engine, tag in zip(self.engines, self.tags)
+        ]
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.engines)
+
+    def shard_for(self, user_id: int) -> int:
+        return shard_index(user_id, self.shard_count)
+
+    def session_for(self, user_id: int) -> Session:
+        return self._sessionmakers[self.shard_for(user_id)]()
+
+    def session_for_shard(self, index: int) -> Session:
+        return self._sessionmakers[index]()
+
+    def create_all(self) -> None:
+        """Create the user-scoped and shard-local tables in every shard"""
+        tables = [Base.metadata.tables[name] for name in USER_SCOPED_TABLES + SHARD_LOCAL_TABLES]
+        for url in self.shard_urls:
+            # Plain engine: with the catalog attached, existence checks would find the catalog's copies
+            engine = create_engine(url)
+            Base.metadata.create_all(bind=engine, tables=tables)
+            with engine.begin() as connection:
+                _seed_sync_counter(connection)
+            engine.dispose()
+
+    def dispose(self) -> None:
+        for engine in self.engines:
+            engine.dispose()
+
+_router: Optional[ShardRouter] = ShardRouter(SHARD_URLS) if SHARD_URLS else None
+
+def get_shard_router() -> Optional[ShardRouter]:
+    return _router
+
+def set_shard_router(router: Optional[ShardRouter]) -> None:
+    global _router
+    _router = router
+
+def check_rebalance(db: Session, router: ShardRouter) -> None:
+    """Refuse user rows while a rebalance is moving them, or has moved them under a shard list this process lacks"""
+    table = Base.metadata.tables["shard_rebalance"]
+    row = db.execute(select(table.c.shard_tags, table.c.finished).where(table.c.id == 1)).first()
+    if row is not None and not (row.finished and row.shard_tags == format_shard_tags(router.tags)):
+        raise HTTPException(
+            status_code=503,
+            detail="Shards are being rebalanced, retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+def get_user_db(user_id: int, db: Session = Depends(get_db)):
+    """Session for the shard holding `user_id` (the request session when unsharded)"""
+    router = get_shard_router()
+    if router is None:
+        yield db
+        return
+    check_rebalance(db, router)
+    shard_db = router.session_for(user_id)
+    try:
+        yield shard_db
+    finally:
+        shard_db.close()
+
+@contextmanager
+def session_for_user(db: Session, user_id: int) -> Iterator[Session]:
+    """Like get_user_db, for user ids that arrive in a request body"""
+    router = get_shard_router()
+    if router is None:
+        yield db
+        return
+    check_rebalance(db, router)
+    shard_db = router.session_for(user_id)
+    try:
+        yield shard_db
+    finally:
+        shard_db.close()
+
+def open_user_sessions(db: Session) -> List[Session]:
+    """One session per shard, for fan-out over all users; [db] when unsharded.
+
+    Callers close the returned sessions (closing `db` again is harmless).
+    """
+    router = get_shard_router()
+    if router is None:
+        return [db]
+    check_rebalance(db, router)
+    return [router.session_for_shard(index) for index in range(router.shard_count)]
+
+@contextmanager
+def user_sessions(db: Session) -> Iterator[List[Session]]:
+    sessions = open_user_sessions(db)
+    try:
+        yield sessions
+    finally:
+        for session in sessions:
+            if session is not db:
+                session.close()
@@ -0,0 +1,347 @@
+"""Memory-mapped, read-only snapshot of the program catalog.
+
+All programs and activities are written to one binary file that every worker
+process maps read-only, so the page cache holds a single shared copy and a new
+worker starts warm. The file is rebuilt when catalog content changes and swapped
+in with os.replace; workers notice the new file and map it on their next refresh.
+
+Layout (little-endian):
+
+    header          magic, format version, content version, program and activity
+                    counts, offsets of the three index tables
+    program index   (program_id, record offset, record length, first day entry,
+                    day entry count), sorted by program_id
+    day index       (day_number, first activity entry, activity count), grouped
+                    by program and sorted by day
+    activity index  (record offset, record length), in (program, day, id) order
+    records         packed program and activity rows
+
+The content version is the highest change version (see versioning) across
+programs and activities; together with the row counts it tells whether the
+file still matches the database.
+
+Catalog writes made through this process call catalog_changed(), and reads fall
+back to the database until a snapshot including them is mapped, so the API
+reads its own writes. Writes made elsewhere show up on the next refresh.
+"""
+import bisect
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database.records import ACTIVITY_RECORD_COLUMNS, ActivityRecord
+from app.models.models import Activity, Program
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PRDGSNAP"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sHxxQIIQQQ")
+_PROGRAM_ENTRY = struct.Struct("<qQIII")
+_DAY_ENTRY = struct.Struct("<iII")
+_ACTIVITY_ENTRY = struct.Struct("<QI")
+_PROGRAM_FIXED = struct.Struct("<qi")
+_ACTIVITY_FIXED = struct.Struct("<qqii")
+_LENGTH = struct.Struct("<I")
+
+_NULL_INT = -2**31
+_NULL_LENGTH = 0xFFFFFFFF
+
+Signature = Tuple[int, int, int]  # (content version, program count, activity count)
+
+def _pack_strings(*values: Optional[str]) -> bytes:
+    parts = []
+    for value in values:
+        if value is None:
+            parts.append(_LENGTH.pack(_NULL_LENGTH))
+        else:
+            encoded = value.encode()
+            parts.append(_LENGTH.pack(len(encoded)) + encoded)
+    return b"".join(parts)
+
+def _unpack_strings(buffer, offset: int, count: int) -> List[Optional[str]]:
+    values = []
+    for _ in range(count):
+        (length,) = _LENGTH.unpack_from(buffer, offset)
+        offset += _LENGTH.size
+        if length == _NULL_LENGTH:
+            values.append(None)
+        else:
+            values.append(bytes(buffer[offset:offset + length]).decode())
+            offset += length
+    return values
+
+def _int_or_null(value: Optional[int]) -> int:
+    return _NULL_INT if value is None else value
+
+def _null_int(value: int) -> Optional[int]:
+    return None if value == _NULL_INT else value
+
+def catalog_signature(db: Session) -> Signature:
+    """What the snapshot must match to be current"""
+    program_version, program_count = db.execute(
+        select(func.coalesce(func.max(Program.version), 0), func.count(Program.id))
+    ).one()
+    activity_version, activity_count = db.execute(
+        select(func.coalesce(func.max(Activity.version), 0), func.count(Activity.id))
+    ).one()
+    return max(program_version, activity_version), program_count, activity_count
+
+def build_snapshot(db: Session, path: str) -> Signature:
+    """Write a snapshot of the catalog to `path`, replacing any existing file atomically"""
+    signature = catalog_signature(db)
+    programs = db.execute(
+        select(Program.id, Program.duration_days, Program.name, Program.description, Program.created_at)
+        .order_by(Program.id)
+    ).all()
+    activities = db.execute(
+        select(*ACTIVITY_RECORD_COLUMNS).order_by(Activity.program_id, Activity.day_number, Activity.id)
+    ).all()
+
+    records = bytearray()
+    activity_entries = []
+    day_entries = []
+    days_by_program = {}
+    for row in activities:
+        activity = ActivityRecord._make(row)
+        data = _ACTIVITY_FIXED.pack(
+            activity.id, activity.program_id,
+            _int_or_null(activity.day_number), _int_or_null(activity.duration_minutes)
+        ) + _pack_strings(activity.title, activity.description, activity.category)
+        program_days = days_by_program.setdefault(activity.program_id, [])
+        if program_days and day_entries[program_days[-1]][0] == activity.day_number:
+            day_entries[program_days[-1]][2] += 1
+        else:
+            program_days.append(len(day_entries))
+            day_entries.append([_int_or_null(activity.day_number), len(activity_entries), 1])
+        activity_entries.append((len(records), len(data)))
+        records += data
+
+    program_entries = []
+    for program_id, duration_days, name, description, created_at in programs:
+        data = _PROGRAM_FIXED.pack(program_id, _int_or_null(duration_days)) + _pack_strings(
+            name, description, created_at.isoformat() if created_at else None
+        )
+        program_days = days_by_program.get(program_id, [])
+        first_day = program_days[0] if program_days else 0
+        program_entries.append((program_id, len(records), len(data), first_day, len(program_days)))
+        records += data
+
+    program_index_offset = _HEADER.size
+    day_index_offset = program_index_offset + len(program_entries) * _PROGRAM_ENTRY.size
+    activity_index_offset = day_index_offset + len(day_entries) * _DAY_ENTRY.size
+    records_offset = activity_index_offset + len(activity_entries) * _ACTIVITY_ENTRY.size
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".catalog-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(
+                MAGIC, FORMAT_VERSION, signature[0], len(program_entries), len(activity_entries),
+                program_index_offset, day_index_offset, activity_index_offset
+            ))
+            for program_id, offset, length, first_day, day_count in program_entries:
+                f.write(_PROGRAM_ENTRY.pack(program_id, records_offset + offset, length, first_day, day_count))
+            for day_number, first_activity, count in day_entries:
+                f.write(_DAY_ENTRY.pack(day_number, first_activity, count))
+            for offset, length in activity_entries:
+                f.write(_ACTIVITY_ENTRY.pack(records_offset + offset, length))
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    # The signature was read before the rows; a change in between only makes the next check rebuild
+    return signature
+
+class CatalogSnapshot:
+    """Read-only view of a snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, format_version, self.content_version, self.program_count, self.activity_count,
+         self._program_index, self._day_index, self._activity_index) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} catalog snapshot")
+        self._program_ids = [
+            _PROGRAM_ENTRY.unpack_from(self._mmap, self._program_index + i * _PROGRAM_ENTRY.size)[0]
+            for i in range(self.program_count)
+        ]
+
+    @property
+    def signature(self) -> Signature:
+        return self.content_version, self.program_count, self.activity_count
+
+    def _program_entry(self, program_id: int):
+        position = bisect.bisect_left(self._program_ids, program_id)
+        if position == len(self._program_ids) or self._program_ids[position] != program_id:
+            return None
+        return _PROGRAM_ENTRY.unpack_from(self._mmap, self._program_index + position * _PROGRAM_ENTRY.size)
+
+    def _activity(self, index: int) -> ActivityRecord:
+        offset, _ = _ACTIVITY_ENTRY.unpack_from(self._mmap, self._activity_index + index * _ACTIVITY_ENTRY.size)
+        activity_id, program_id, day_number, duration_minutes = _ACTIVITY_FIXED.unpack_from(self._mmap, offset)
+        title, description, category = _unpack_strings(self._mmap, offset + _ACTIVITY_FIXED.size, 3)
+        return ActivityRecord(
+            activity_id, program_id, title, description,
+            _null_int(day_number), _null_int(duration_minutes), category
+        )
+
+    def has_program(self, program_id: int) -> bool:
+        return self._program_entry(program_id) is not None
+
+    def get_program(self, program_id: int) -> Optional[dict]:
+        """The program's columns and all of its activities, shaped like the Program schema"""
+        entry = self._program_entry(program_id)
+        if entry is None:
+            return None
+        _, offset, _, _, _ = entry
+        _, duration_days = _PROGRAM_FIXED.unpack_from(self._mmap, offset)
+        name, description, created_at = _unpack_strings(self._mmap, offset + _PROGRAM_FIXED.size, 3)
+        return {
+            "id": program_id,
+            "name": name,
+            "description": description,
+            "duration_days": _null_int(duration_days),
+            "created_at": datetime.fromisoformat(created_at) if created_at else None,
+            "activities": [activity._asdict() for activity in self.activities_for_program(program_id)],
+        }
+
+    def activities_for_days(self, program_id: int, first_day: int, last_day: int) -> List[ActivityRecord]:
+        """Activities with first_day <= day_number <= last_day, ordered by day and id"""
+        entry = self._program_entry(program_id)
+        if entry is None:
+            return []
+        _, _, _, first_entry, day_count = entry
+        activities = []
+        for i in range(first_entry, first_entry + day_count):
+            day_number, first_activity, count = _DAY_ENTRY.unpack_from(
+                self._mmap, self._day_index + i * _DAY_ENTRY.size
+            )
+            if day_number != _NULL_INT and first_day <= day_number <= last_day:
+                activities += [self._activity(index) for index in range(first_activity, first_activity + count)]
+        return activities
+
+    def activities_for_program(self, program_id: int) -> List[ActivityRecord]:
+        return self.activities_for_days(program_id, -2**31 + 1, 2**31 - 1)
+
+class SnapshotManager:
+    """Keeps this process mapped to a current snapshot.
+
+    Every `refresh_seconds`, and right after this process changes the catalog,
+    the catalog signature is compared with the file's; on a mismatch one process
+    rebuilds it (an flock serializes the workers) and every process maps the new
+    file once it notices the inode changed.
+    """
+
+    def __init__(self, path: str, session_factory: sessionmaker, refresh_seconds: float):
+        self.path = path
+        self._session_factory = session_factory
+        self._refresh_seconds = refresh_seconds
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._changes = 0  # Catalog writes committed by this process
+        self._mapped_changes = 0  # How many of them the mapped snapshot is known to include
+        self._changes_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.refresh()
+        if self._refresh_seconds > 0:
+            self._thread = threading.Thread(target=self._run, name="catalog-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def current(self) -> Optional[CatalogSnapshot]:
+        """The mapped snapshot, or None while it may predate this process's own writes"""
+        if self._mapped_changes < self._changes:
+            return None
+        return self.snapshot
+
+    def catalog_changed(self) -> None:
+        """Record a committed catalog write; reads use the database until a refresh picks it up"""
+        with self._changes_lock:
+            self._changes += 1
+        if self._thread is None:
+            self.refresh()
+        else:
+            self._wake.set()
+
+    def refresh(self) -> None:
+        # Writes counted so far are committed, so the signature read below includes them
+        changes = self._changes
+        db = self._session_factory()
+        try:
+            signature = catalog_signature(db)
+            if self._file_signature() != signature:
+                with open(self.path + ".lock", "w") as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    # Another worker may have rebuilt it while we waited
+                    if self._file_signature() != signature:
+                        build_snapshot(db, self.path)
+                        logger.info("Rebuilt catalog snapshot %s at version %d", self.path, signature[0])
+        finally:
+            db.close()
+        # A plain reference swap: requests holding the old snapshot finish on the old mapping
+        if self.snapshot is None or os.stat(self.path).st_ino != self.snapshot.inode:
+            self.snapshot = CatalogSnapshot(self.path)
+        with self._changes_lock:
+            self._mapped_changes = max(self._mapped_changes, changes)
+
+    def _file_signature(self) -> Optional[Signature]:
+        """Signature from the file's header alone, or None if it is missing or not a snapshot"""
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(_HEADER.size)
+            magic, format_version, content_version, program_count, activity_count, *_ = _HEADER.unpack(header)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            return None
+        return content_version, program_count, activity_count
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._refresh_seconds)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Catalog snapshot refresh failed")
+
+_manager: Optional[SnapshotManager] = None
+
+def get_catalog_snapshot() -> Optional[CatalogSnapshot]:
+    """The mapped snapshot, or None when snapshots are disabled or behind this process's writes"""
+    return _manager.current() if _manager else None
+
+def catalog_changed() -> None:
+    """Call after committing program or activity changes"""
+    if _manager:
+        _manager.catalog_changed()
+
+def set_snapshot_manager(manager: Optional[SnapshotManager]) -> None:
+    global _manager
+    _manager = manager
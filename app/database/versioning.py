@@ -0,0 +1,81 @@
+import base64
+import binascii
+from typing import NamedTuple
+
+from sqlalchemy import Table, event, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+# Sync cursors are opaque to clients: prefixed, base64-encoded version numbers
+_CURSOR_PREFIX = "v2:"
+_LEGACY_CURSOR_PREFIX = "v1:"
+
+class SyncCursor(NamedTuple):
+    """Where a client's last sync stopped.
+
+    Catalog rows and user rows are versioned by different counters once users
+    are sharded (each shard has its own), so the cursor keeps one version per
+    counter, plus the tag of the shard the user versions came from.
+    """
+    catalog_version: int
+    shard_tag: int
+    user_version: int
+
+def reserve_versions(connection: Connection, counter: Table, count: int = 1) -> int:
+    """Reserve `count` consecutive change versions and return the first one.
+
+    The counter row is updated inside the caller's transaction, so writers are
+    serialized on it and versions become visible in commit order.
+    """
+    result = connection.execute(
+        update(counter).where(counter.c.id == 1).values(value=counter.c.value + count)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(counter).values(id=1, value=count))
+    last = connection.execute(select(counter.c.value).where(counter.c.id == 1)).scalar_one()
+    return last - count + 1
+
+def register_versioning(counter: Table, *models, attribute: str = "version", new_only: bool = False) -> None:
+    """Stamp a fresh change version on new or modified instances of `models` at flush time.
+
+    With `new_only`, only new instances are stamped, so `attribute` records when
+    the row was created rather than when it last changed. New instances without
+    an id get `id_base + version` when the session's info has an "id_base" (a
+    shard's id range), so ids never collide across shards.
+    """
+    versioned = tuple(models)
+
+    @event.listens_for(Session, "before_flush")
+    def assign_versions(session, flush_context, instances):
+        candidates = list(session.new) if new_only else list(session.new) + list(session.dirty)
+        changed = [
+            obj for obj in candidates
+            if isinstance(obj, versioned) and (obj in session.new or session.is_modified(obj))
+        ]
+        if not changed:
+            return
+        version = reserve_versions(session.connection(), counter, len(changed))
+        id_base = session.info.get("id_base")
+        for offset, obj in enumerate(changed):
+            setattr(obj, attribute, version + offset)
+            if id_base is not None and obj in session.new and obj.id is None:
+                obj.id = id_base + version + offset
+
+def encode_cursor(cursor: SyncCursor) -> str:
+    raw = _CURSOR_PREFIX + ":".join(str(part) for part in cursor)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> SyncCursor:
+    """Decode a sync cursor, raising ValueError if it was not issued by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid sync cursor")
+    if raw.startswith(_LEGACY_CURSOR_PREFIX) and raw[len(_LEGACY_CURSOR_PREFIX):].isdigit():
+        # Issued before sharding: one counter for everything
+        version = int(raw[len(_LEGACY_CURSOR_PREFIX):])
+        return SyncCursor(version, 0, version)
+    parts = raw[len(_CURSOR_PREFIX):].split(":")
+    if not raw.startswith(_CURSOR_PREFIX) or len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError("Invalid sync cursor")
+    return SyncCursor(*(int(part) for part in parts))
@@ -0,0 +1,117 @@
+"""Production entry point: a gunicorn master running uvicorn workers.
+
+    python -m app.launcher
+
+The app is imported once in the master and workers are forked from it, so they
+start warm and share the imported code's memory. Each worker then drops the
+database connection pools inherited from the master and opens its own.
+
+Workers are recycled after PRODIGY_MAX_REQUESTS requests (plus random jitter
+so they do not all restart at once) to bound memory growth. Signals follow
+gunicorn:
+
+    HUP    start fresh workers from the already-loaded app, then stop the old
+           ones gracefully (picks up configuration, not code, since the app is
+           preloaded)
+    USR2   start a new master from the current code next to the old one; send
+           the old master TERM once the new one is serving, for a zero-downtime
+           code upgrade
+    TERM   stop gracefully, letting in-flight requests finish within
+           PRODIGY_GRACEFUL_TIMEOUT_SECONDS
+"""
+import logging
+import os
+from typing import List, Optional
+
+from gunicorn.app.base import BaseApplication
+
+from app.config import (
+    HOST, PORT, WORKERS, MAX_REQUESTS, MAX_REQUESTS_JITTER, GRACEFUL_TIMEOUT_SECONDS, WORKER_TIMEOUT_SECONDS,
+    IDEMPOTENCY_BACKEND
+)
+
+logger = logging.getLogger(__name__)
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects container CPU sets, unlike os.cpu_count)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def worker_count(configured: int = WORKERS, cpus: Optional[int] = None) -> int:
+    """The configured worker count, or one worker per available CPU when it is 0.
+
+    Workers are async, with sync endpoints on each worker's threadpool, so one
+    per core keeps every core busy without the 2n+1 rule for sync workers.
+    """
+    if configured > 0:
+        return configured
+    return max(cpus or available_cpus(), 1)
+
+def multi_worker_warnings(workers: int) -> List[str]:
+    """Settings that only work within one process, which several workers would silently break"""
+    if workers <= 1:
+        return []
+    from app.utils.pubsub import LocalBroadcaster, broker
+
+    warnings = []
+    if isinstance(broker.broadcaster, LocalBroadcaster):
+        warnings.append(
+            "Live events use the in-process broadcaster: SSE clients only see events from writes "
+            "handled by the worker they are connected to"
+        )
+    if IDEMPOTENCY_BACKEND == "memory":
+        warnings.append(
+            "Idempotency keys are kept per process: a retry reaching another worker runs again; "
+            "set PRODIGY_IDEMPOTENCY_BACKEND=database"
+        )
+    return warnings
+
+def post_fork(server, worker) -> None:
+    """Give the worker its own connection pools instead of the master's"""
+    from app.database.database import engine
+    from app.database.sharding import get_shard_router
+
+    # close=False leaves the master's connections alone; the worker just forgets them
+    engine.dispose(close=False)
+    router = get_shard_router()
+    if router is not None:
+        for shard_engine in router.engines:
+            shard_engine.dispose(close=False)
+
+def gunicorn_options() -> dict:
+    return {
+        "bind": f"{HOST}:{PORT}",
+        "workers": worker_count(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "post_fork": post_fork,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "graceful_timeout": GRACEFUL_TIMEOUT_SECONDS,
+        "timeout": WORKER_TIMEOUT_SECONDS,
+        "accesslog": "-",
+    }
+
+class ProdigyApplication(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+def main():
+    options = gunicorn_options()
+    for warning in multi_worker_warnings(options["workers"]):
+        logger.warning("%d workers: %s", options["workers"], warning)
+    ProdigyApplication(options).run()
+
+if __name__ == "__main__":
+    main()
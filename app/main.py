@@ -1,19 +1,102 @@
-from fastapi import FastAPI
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from app.api.endpoints import router
-from app.database.database import engine
+from app.config import (
+    ROLLUP_INTERVAL_SECONDS, ROLLUP_LOCK_PATH, READ_CONCURRENCY, READ_QUEUE_SIZE, WRITE_CONCURRENCY, WRITE_QUEUE_SIZE,
+    EXPORT_CONCURRENCY, EXPORT_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS, RETRY_AFTER_SECONDS, PROFILING_TOKEN, PROFILE_HISTORY_SIZE,
+    CATALOG_SNAPSHOT_PATH, CATALOG_SNAPSHOT_REFRESH_SECONDS,
+    IDEMPOTENCY_BACKEND, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_PENDING_SECONDS
+)
+from app.database.database import SessionLocal, engine
+from app.database.rollups import RollupScheduler
+from app.database.sharding import get_shard_router
+from app.database.snapshot import SnapshotManager, set_snapshot_manager
+from app.middleware.admission import AdmissionControlMiddleware, AdmissionGate, render_metrics
+from app.middleware.idempotency import DatabaseIdempotencyStore, IdempotencyMiddleware, MemoryIdempotencyStore
+from app.middleware.profiling import ProfileStore, ProfilingMiddleware
 from app.models.models import Base
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+if get_shard_router() is not None:
+    get_shard_router().create_all()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Optional in-process rollups, run by one worker at a time; otherwise run_rollups.py is scheduled externally
+    scheduler = None
+    if ROLLUP_INTERVAL_SECONDS > 0:
+        scheduler = RollupScheduler(SessionLocal, ROLLUP_INTERVAL_SECONDS, ROLLUP_LOCK_PATH)
+        scheduler.start()
+    # Optional shared catalog snapshot; built here if missing or stale, then kept current
+    snapshots = None
+    if CATALOG_SNAPSHOT_PATH:
+        snapshots = SnapshotManager(CATALOG_SNAPSHOT_PATH, SessionLocal, CATALOG_SNAPSHOT_REFRESH_SECONDS)
+        snapshots.start()
+        set_snapshot_manager(snapshots)
+    yield
+    if snapshots:
+        set_snapshot_manager(None)
+        snapshots.stop()
+    if scheduler:
+        scheduler.stop()
 
 app = FastAPI(
     title="Prodigy Programs API",
     description="API for managing daily 5-minute program activities",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Opt-in per-request profiling; added inside admission control so queueing time is not profiled
+profile_store = ProfileStore(PROFILE_HISTORY_SIZE)
+if PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware, token=PROFILING_TOKEN, store=profile_store)
+
+# Bound concurrency per route class and shed excess load with 503 + Retry-After
+admission_gates = {
+    "read": AdmissionGate("read", READ_CONCURRENCY, READ_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT_SECONDS),
+    "write": AdmissionGate("write", WRITE_CONCURRENCY, WRITE_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT_SECONDS),
+    "export": AdmissionGate("export", EXPORT_CONCURRENCY, EXPORT_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT_SECONDS),
+}
+app.add_middleware(AdmissionControlMiddleware, gates=admission_gates, retry_after_seconds=RETRY_AFTER_SECONDS)
+
+# Replay stored responses for retried writes; outermost, so replays skip the admission queue
+if IDEMPOTENCY_BACKEND == "database":
+    idempotency_store = DatabaseIdempotencyStore(SessionLocal, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_PENDING_SECONDS)
+elif IDEMPOTENCY_BACKEND == "memory":
+    idempotency_store = MemoryIdempotencyStore(
+        IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_PENDING_SECONDS
+    )
+else:
+    idempotency_store = None
+if idempotency_store is not None:
+    app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
 app.include_router(router, prefix="/api/v1")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return render_metrics(admission_gates)
+
+def require_profiling_token(x_profile: str = Header("")):
+    if not PROFILING_TOKEN or not hmac.compare_digest(x_profile.encode(), PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=404, detail="Not found")
+
+@app.get("/admin/profiles", dependencies=[Depends(require_profiling_token)])
+def list_profiles():
+    return profile_store.summaries()
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_profiling_token)])
+def get_profile(profile_id: int):
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Prodigy Programs API"}
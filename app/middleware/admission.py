@@ -0,0 +1,113 @@
+import asyncio
+import json
+from typing import Callable, Dict, List, Optional
+
+class AdmissionGate:
+    """Concurrency limit with a bounded, deadline-limited wait queue.
+
+    Only touched from the event loop thread, so the counters need no locking.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted_total = 0
+        self.shed_queue_full_total = 0
+        self.shed_timeout_total = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def acquire(self) -> bool:
+        """Wait for a slot; False means the request should be shed"""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.shed_queue_full_total += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # Nobody would be waiting for the answer by the time we got to it
+            self.shed_timeout_total += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.admitted_total += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+def classify_request(scope) -> Optional[str]:
+    """Route class for a request, or None for routes that bypass admission control"""
+    path = scope["path"]
+    # Long-lived streams would pin a slot for their whole lifetime
+    if path.endswith("/events") or path == "/metrics":
+        return None
+    # Exports stream for as long as the download takes; keep them from starving short reads
+    if path.endswith("/completions/export"):
+        return "export"
+    return "read" if scope["method"] in ("GET", "HEAD") else "write"
+
+class AdmissionControlMiddleware:
+    """Sheds load with 503 + Retry-After instead of letting requests queue until clients time out"""
+
+    def __init__(
+        self,
+        app,
+        gates: Dict[str, AdmissionGate],
+        classify: Callable = classify_request,
+        retry_after_seconds: int = 1
+    ):
+        self.app = app
+        self.gates = gates
+        self.classify = classify
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        gate = self.gates.get(self.classify(scope))
+        if gate is None:
+            return await self.app(scope, receive, send)
+
+        if not await gate.acquire():
+            return await self._reject(send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Server is overloaded, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after_seconds).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def render_metrics(gates: Dict[str, AdmissionGate]) -> str:
+    """Admission control counters in the Prometheus text exposition format"""
+    metrics = [
+        ("prodigy_admission_in_flight", "gauge", "Requests currently executing", lambda g: g.in_flight),
+        ("prodigy_admission_queue_depth", "gauge", "Requests waiting for a slot", lambda g: g.waiting),
+        ("prodigy_admission_admitted_total", "counter", "Requests admitted", lambda g: g.admitted_total),
+    ]
+    lines: List[str] = []
+    for name, kind, help_text, value in metrics:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{route_class="{gate.name}"}} {value(gate)}' for gate in gates.values()]
+    lines += ["# HELP prodigy_admission_shed_total Requests rejected with 503", "# TYPE prodigy_admission_shed_total counter"]
+    for gate in gates.values():
+        lines.append(f'prodigy_admission_shed_total{{route_class="{gate.name}",reason="queue_full"}} {gate.shed_queue_full_total}')
+        lines.append(f'prodigy_admission_shed_total{{route_class="{gate.name}",reason="timeout"}} {gate.shed_timeout_total}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.models.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+MAX_KEY_LENGTH = 255
+
+# Write routes whose retries are replayed, matched against the full request path
+IDEMPOTENT_ROUTES = [
+    re.compile(r"^/api/v1/users/\d+/complete-activity$"),
+    re.compile(r"^/api/v1/user-progress/$"),
+    re.compile(r"^/api/v1/users/$"),
+]
+
+# Headers describing the original response rather than its content; not replayed
+_SKIPPED_HEADERS = {b"date", b"server", b"x-profile-id"}
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: Optional[int]  # None while the request that claimed the key is still running
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+    @property
+    def pending(self) -> bool:
+        return self.status_code is None
+
+def _pending(fingerprint: str) -> StoredResponse:
+    return StoredResponse(fingerprint, None, [], b"")
+
+class MemoryIdempotencyStore:
+    """LRU of stored responses with a TTL, local to one process"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000, pending_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.pending_seconds = pending_seconds
+        self._entries: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Claim `key` for a new request (None), or return what is already stored under it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._set(key, _pending(fingerprint), self.pending_seconds)
+            return None
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        with self._lock:
+            self._set(key, response, self.ttl_seconds)
+
+    def release(self, key: str) -> None:
+        """Drop an unfinished claim so the request can be retried"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1].pending:
+                del self._entries[key]
+
+    def _set(self, key: str, response: StoredResponse, ttl_seconds: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class DatabaseIdempotencyStore:
+    """Stored responses in the idempotency_keys table, shared by every worker.
+
+    A key is claimed by inserting a pending row, so of several workers racing
+    on the same key exactly one wins the primary key and runs the request.
+    """
+
+    PURGE_EVERY = 100  # Completed requests between sweeps of expired rows
+    CLAIM_ATTEMPTS = 3
+
+    def __init__(self, session_factory: sessionmaker, ttl_seconds: float, pending_seconds: float = 60):
+        self._session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.pending_seconds = pending_seconds
+        self._completed = 0
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Claim `key` for a new request (None), or return what is already stored under it"""
+        db = self._session_factory()
+        try:
+            for _ in range(self.CLAIM_ATTEMPTS):
+                now = datetime.utcnow()
+                try:
+                    db.add(IdempotencyKey(
+                        key=key, fingerprint=fingerprint,
+                        expires_at=now + timedelta(seconds=self.pending_seconds)
+                    ))
+                    db.commit()
+                    return None
+                except IntegrityError:
+                    db.rollback()
+                row = db.execute(
+                    select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.headers,
+                           IdempotencyKey.body, IdempotencyKey.expires_at)
+                    .where(IdempotencyKey.key == key)
+                ).first()
+                if row is None:
+                    continue  # Released or purged in between; try the insert again
+                if row.expires_at > now:
+                    return _from_row(row)
+                # Expired (or abandoned by a dead worker): take it over unless someone else just did
+                taken = db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+                    .values(fingerprint=fingerprint, status_code=None, headers=None, body=None,
+                            expires_at=now + timedelta(seconds=self.pending_seconds))
+                ).rowcount
+                db.commit()
+                if taken:
+                    return None
+            # Still contended after several attempts: treat it as in progress
+            return _pending(fingerprint)
+        finally:
+            db.close()
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        now = datetime.utcnow()
+        db = self._session_factory()
+        try:
+            db.execute(
+                update(IdempotencyKey).where(IdempotencyKey.key == key).values(
+                    status_code=response.status_code,
+                    headers=json.dumps([[name.decode(), value.decode()] for name, value in response.headers]),
+                    body=response.body,
+                    expires_at=now + timedelta(seconds=self.ttl_seconds)
+                )
+            )
+            self._completed += 1
+            if self._completed % self.PURGE_EVERY == 0:
+                db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str) -> None:
+        """Drop an unfinished claim so the request can be retried"""
+        db = self._session_factory()
+        try:
+            db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+def _from_row(row) -> StoredResponse:
+    if row.status_code is None:
+        return _pending(row.fingerprint)
+    headers = [(name.encode(), value.encode()) for name, value in json.loads(row.headers)]
+    return StoredResponse(row.fingerprint, row.status_code, headers, row.body)
+
+def caller_identity(scope, body: bytes) -> str:
+    """Who a key belongs to, so different callers reusing a key value never share responses.
+
+    The caller is identified by its Authorization header (hashed), else by an
+    X-Client-Id header, else by its address; a user_id in a JSON body narrows
+    it further, for routes whose path carries no user.
+    """
+    headers = dict(scope["headers"])
+    if b"authorization" in headers:
+        caller = "auth:" + hashlib.sha256(headers[b"authorization"]).hexdigest()[:32]
+    elif b"x-client-id" in headers:
+        caller = "client:" + headers[b"x-client-id"].decode("latin-1")
+    else:
+        caller = "addr:" + (scope["client"][0] if scope.get("client") else "unknown")
+    try:
+        user_id = json.loads(body).get("user_id")
+    except (ValueError, AttributeError):
+        user_id = None
+    if isinstance(user_id, int):
+        caller += f"/user:{user_id}"
+    return caller
+
+class IdempotencyMiddleware:
+    """Replays the stored response for retried writes carrying the same Idempotency-Key.
+
+    Keys are scoped to the caller (see caller_identity), method and path. The
+    first request claims its key in the store before reaching the endpoint; its
+    response (unless 5xx, so server errors stay retryable) is then stored for
+    the store's TTL and replayed to later requests without running them again.
+    A reused key with a different body is rejected with 422, and a retry arriving
+    while the claiming request is still running, on any worker sharing the
+    store, gets 409.
+    """
+
+    def __init__(self, app, store, routes: Sequence[Pattern] = IDEMPOTENT_ROUTES):
+        self.app = app
+        self.store = store
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        header = dict(scope["headers"]).get(IDEMPOTENCY_HEADER)
+        if header is None or not any(route.match(scope["path"]) for route in self.routes):
+            return await self.app(scope, receive, send)
+        if not header or len(header) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, "Invalid Idempotency-Key header")
+
+        body = await _read_body(receive)
+        key = f"{caller_identity(scope, body)} {scope['method']} {scope['path']} {header.decode('latin-1')}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        stored = await run_in_threadpool(self.store.claim, key, fingerprint)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                return await _send_json(send, 422, "Idempotency-Key was already used with a different request body")
+            if stored.pending:
+                return await _send_json(send, 409, "A request with this Idempotency-Key is already in progress")
+            return await _replay(send, stored)
+
+        status_code = None
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [(name, value) for name, value in message.get("headers", [])
+                           if name.lower() not in _SKIPPED_HEADERS]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_body(body, receive), capture)
+        except BaseException:
+            await run_in_threadpool(self.store.release, key)
+            raise
+        try:
+            if status_code is not None and status_code < 500:
+                response = StoredResponse(fingerprint, status_code, headers, b"".join(chunks))
+                await run_in_threadpool(self.store.complete, key, response)
+            else:
+                await run_in_threadpool(self.store.release, key)
+        except Exception:
+            # The response has already gone out; an unrecorded key only means a retry runs again
+            logger.exception("Failed to record the response for an idempotency key")
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+def _replay_body(body: bytes, receive):
+    """A receive callable that hands the already-read body to the app, then defers to the client"""
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return replay
+
+async def _replay(send, stored: StoredResponse):
+    await send({
+        "type": "http.response.start",
+        "status": stored.status_code,
+        "headers": stored.headers + [REPLAYED_HEADER],
+    })
+    await send({"type": "http.response.body", "body": stored.body})
+
+async def _send_json(send, status_code: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,224 @@
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import itertools
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 20
+
+class ProfileRecord:
+    """Everything collected for one profiled request"""
+
+    def __init__(self, profile_id: int, method: str, path: str):
+        self.profile_id = profile_id
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self.duration_ms = 0.0
+        self.statements: List[dict] = []
+        self.allocations: List[dict] = []
+        self._profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add_profiler(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            self._profilers.append(profiler)
+
+    def add_statement(self, statement: str, parameters, duration_ms: float) -> None:
+        with self._lock:
+            self.statements.append({
+                "statement": statement,
+                "parameters": repr(parameters),
+                "duration_ms": round(duration_ms, 3)
+            })
+
+    def report(self) -> dict:
+        stream = io.StringIO()
+        if self._profilers:
+            stats = pstats.Stats(*self._profilers, stream=stream)
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        return {
+            "id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 3),
+            "sql_count": len(self.statements),
+            "sql_ms": round(sum(s["duration_ms"] for s in self.statements), 3),
+            "statements": self.statements,
+            "allocations": self.allocations,
+            "profile": stream.getvalue(),
+        }
+
+# The profile of the request being handled; copied into threadpool workers with the context
+current_profile: ContextVar[Optional[ProfileRecord]] = ContextVar("current_profile", default=None)
+
+class ProfileStore:
+    """The most recent reports, oldest dropped first"""
+
+    def __init__(self, max_reports: int = 50):
+        self.max_reports = max_reports
+        self._reports: "OrderedDict[int, dict]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, report: dict) -> None:
+        with self._lock:
+            self._reports[report["id"]] = report
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        return self._reports.get(profile_id)
+
+    def summaries(self) -> List[dict]:
+        with self._lock:
+            reports = list(self._reports.values())
+        keys = ("id", "method", "path", "status", "duration_ms", "sql_count", "sql_ms")
+        return [{key: report[key] for key in keys} for report in reversed(reports)]
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record = current_profile.get()
+    if record is not None and conn.info.get("profile_started"):
+        started = conn.info["profile_started"].pop()
+        record.add_statement(statement, parameters, (time.perf_counter() - started) * 1000)
+
+def install_sql_tracing() -> None:
+    """Record statements run by any engine while a request is being profiled"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+def _profiled(endpoint):
+    """Profile a sync endpoint on the threadpool worker it runs on"""
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        record = current_profile.get()
+        if record is None:
+            return endpoint(*args, **kwargs)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+            record.add_profiler(profiler)
+
+    return wrapper
+
+class ProfiledRoute(APIRoute):
+    """Route class that lets ProfilingMiddleware see inside sync endpoints.
+
+    cProfile only follows the thread it is enabled on, and sync endpoints run in
+    the threadpool, so those get a profiler of their own. Async endpoints are
+    covered by the middleware's profiler on the event loop thread.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+class ProfilingMiddleware:
+    """Profiles requests that carry the admin token in the X-Profile header.
+
+    The report (cProfile stats, tracemalloc deltas, SQL statements and timings)
+    is stored in `store` and its id returned in X-Profile-Id. Only one request
+    is profiled at a time; others carrying the header run normally. The loop
+    thread profiler also sees other requests interleaved on the event loop, so
+    profile on a quiet instance when the numbers matter.
+
+    Only add this middleware (and ProfiledRoute) when profiling is configured;
+    when absent, no request pays anything for it.
+    """
+
+    def __init__(self, app, token: str, store: ProfileStore):
+        if not token:
+            raise ValueError("A profiling token is required")
+        self.app = app
+        self.token = token.encode()
+        self.store = store
+        self._busy = False
+        install_sql_tracing()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy or not self._authorized(scope):
+            return await self.app(scope, receive, send)
+        # Fetching reports would otherwise push the report being looked for out of the store
+        if scope["path"].startswith("/admin/"):
+            return await self.app(scope, receive, send)
+
+        self._busy = True
+        record = ProfileRecord(self.store.next_id(), scope["method"], scope["path"])
+        token = current_profile.set(record)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                record.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER, str(record.profile_id).encode())
+                ]
+            await send(message)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            record.duration_ms = (time.perf_counter() - started) * 1000
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            record.add_profiler(profiler)
+            record.allocations = _allocation_deltas(before, after)
+            current_profile.reset(token)
+            self.store.add(record.report())
+            self._busy = False
+
+    def _authorized(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                return hmac.compare_digest(value, self.token)
+        return False
+
+def _allocation_deltas(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> List[Dict]:
+    # Leave out tracemalloc's own bookkeeping
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    return [
+        {
+            "location": str(stat.traceback),
+            "size_diff_bytes": stat.size_diff,
+            "count_diff": stat.count_diff,
+        }
+        for stat in diff[:TOP_ALLOCATIONS]
+    ]
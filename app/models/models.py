@@ -1,7 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Boolean, Date, DateTime, ForeignKey, Text, Index, LargeBinary
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.database import Base
+from app.database.search import register_search_index
+from app.database.versioning import register_versioning
+
+# Ids of user-scoped rows: 64-bit so each shard can own a range (see sharding); INTEGER on SQLite keeps the rowid alias
+USER_ROW_ID = BigInteger().with_variant(Integer, "sqlite")
 
 class Program(Base):
     __tablename__ = "programs"
@@ -11,6 +18,8 @@ class Program(Base):
     description = Column(Text)
     duration_days = Column(Integer, default=30)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    version = Column(BigInteger, index=True)  # Change version for delta sync
     
     activities = relationship("Activity", back_populates="program")
     user_progress = relationship("UserProgress", back_populates="program")
@@ -25,9 +34,15 @@ class Activity(Base):
     day_number = Column(Integer)  # Day 1-30 for month-long program
     duration_minutes = Column(Integer, default=5)
     category = Column(String)  # e.g., "Exercise", "Meditation", "Reading"
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    version = Column(BigInteger)  # Change version for delta sync
     
     program = relationship("Program", back_populates="activities")
     user_completions = relationship("UserActivityCompletion", back_populates="activity")
+    
+    __table_args__ = (
+        Index("ix_activities_program_id_version", "program_id", "version"),
+    )
 
 
 # USer details table
@@ -45,25 +60,115 @@ class User(Base):
 class UserProgress(Base):
     __tablename__ = "user_progress"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(USER_ROW_ID, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     program_id = Column(Integer, ForeignKey("programs.id"))
     start_date = Column(DateTime)
     current_day = Column(Integer, default=1)
     is_active = Column(Boolean, default=True)
+    completion_mask = Column(BigInteger, default=0, server_default="0")  # Bit N-1 set when day N has a completion
+    enrolled_version = Column(BigInteger)  # Change version at enrollment, so sync sends the whole program once
     
     user = relationship("User", back_populates="progress")
     program = relationship("Program", back_populates="user_progress")
+    
+    __table_args__ = (
+        Index("ix_user_progress_user_id_enrolled_version", "user_id", "enrolled_version"),
+    )
 
 class UserActivityCompletion(Base):
     __tablename__ = "user_activity_completions"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(USER_ROW_ID, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     activity_id = Column(Integer, ForeignKey("activities.id"))
     completed_at = Column(DateTime, server_default=func.now())
     completion_date = Column(DateTime)  # Date for which this activity was completed
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    version = Column(BigInteger)  # Change version for delta sync
     
     user = relationship("User", back_populates="completions")
     activity = relationship("Activity", back_populates="user_completions")
-    
\ No newline at end of file
+    
+    __table_args__ = (
+        Index("ix_user_activity_completions_user_id_version", "user_id", "version"),
+        # Rollups scan new versions and recount whole days across all users
+        Index("ix_user_activity_completions_version", "version"),
+        Index("ix_user_activity_completions_completion_date", "completion_date"),
+        # Never reuse ids: archived completions keep theirs
+        {"sqlite_autoincrement": True},
+    )
+
+class ArchivedActivityCompletion(Base):
+    """Completions of finished enrollments, moved out of the hot table by the archival job"""
+    __tablename__ = "user_activity_completions_archive"
+    
+    id = Column(USER_ROW_ID, primary_key=True)  # Same id as the original completion
+    user_id = Column(Integer, index=True)
+    activity_id = Column(Integer)
+    completed_at = Column(DateTime)
+    completion_date = Column(DateTime)
+    updated_at = Column(DateTime)
+    version = Column(BigInteger)
+    archived_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_user_activity_completions_archive_version", "version"),
+        Index("ix_user_activity_completions_archive_completion_date", "completion_date"),
+        # Plan reads reaching back before the archive cutoff look up one user's dates
+        Index("ix_user_activity_completions_archive_user_id_completion_date", "user_id", "completion_date"),
+    )
+
+class DailyProgramRollup(Base):
+    __tablename__ = "daily_program_rollups"
+    
+    program_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    completions = Column(Integer, default=0)
+    active_users = Column(Integer, default=0)
+    minutes = Column(Integer, default=0)
+
+class DailyCategoryRollup(Base):
+    __tablename__ = "daily_category_rollups"
+    
+    program_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    completions = Column(Integer, default=0)
+    minutes = Column(Integer, default=0)
+
+class RollupState(Base):
+    __tablename__ = "rollup_state"
+    
+    name = Column(String, primary_key=True)
+    high_water_mark = Column(BigInteger, default=0)  # Highest completion version already rolled up
+
+class SyncCounter(Base):
+    __tablename__ = "sync_counter"
+    
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)  # Last change version handed out
+
+class ShardRebalance(Base):
+    """At most one row (id 1), present while rebalance_shards.py moves users; see app.database.sharding"""
+    __tablename__ = "shard_rebalance"
+    
+    id = Column(Integer, primary_key=True)
+    shard_tags = Column(String, nullable=False)  # Comma-separated tags of the new shard list, in order
+    finished = Column(Boolean, default=False)  # Rows moved; workers on the new shard list may resume
+    started_at = Column(DateTime, server_default=func.now())
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    key = Column(String, primary_key=True)  # "<caller> <method> <path> <Idempotency-Key header>"
+    fingerprint = Column(String, nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer)  # NULL while the claiming request is still running
+    headers = Column(Text)  # JSON list of [name, value] pairs
+    body = Column(LargeBinary)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+register_versioning(SyncCounter.__table__, Program, Activity, UserActivityCompletion)
+register_versioning(SyncCounter.__table__, UserProgress, attribute="enrolled_version", new_only=True)
+    
+register_search_index(Program.__table__, Activity.__table__)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from datetime import date, datetime
 from typing import List, Optional
 
 class ActivityBase(BaseModel):
@@ -31,6 +31,9 @@ class ProgramBase(BaseModel):
 class ProgramCreate(ProgramBase):
     pass
 
+class ProgramImport(ProgramBase):
+    activities: List[ActivityBase] = []
+
 class Program(ProgramBase):
     id: int
     created_at: datetime
@@ -69,6 +72,29 @@ class UserProgress(UserProgressBase):
     class Config:
         from_attributes = True
 
+class StreakSummary(BaseModel):
+    user_id: int
+    program_id: int
+    current_day: int
+    current_streak: int
+    longest_streak: int
+    completed_days: int
+    heatmap: List[bool]
+
+# Enrollment filters users with IN (...) lists, which must stay under SQLite's 32766 bind-variable limit
+MAX_COHORT_SIZE = 10000
+
+class CohortEnrollmentRequest(BaseModel):
+    user_ids: List[int] = Field(..., max_length=MAX_COHORT_SIZE)
+    start_date: datetime
+
+class CohortEnrollmentResult(BaseModel):
+    program_id: int
+    requested: int
+    enrolled: int
+    already_enrolled: int
+    unknown_user_ids: List[int] = []
+
 class DayPlan(BaseModel):
     date: datetime
     day_number: int
@@ -85,4 +111,89 @@ class WeekPlan(BaseModel):
 class ActivityCompletionRequest(BaseModel):
     activity_id: int
     completion_date: datetime
-    
\ No newline at end of file
+    
+
+class ProgramImportResult(BaseModel):
+    program_id: int
+    name: str
+    activities_created: int
+
+class ImportLineError(BaseModel):
+    line: int
+    detail: str
+
+class ImportSummary(BaseModel):
+    programs_created: int = 0
+    activities_created: int = 0
+    programs: List[ProgramImportResult] = []
+    errors: List[ImportLineError] = []
+
+class ProgramAnalytics(BaseModel):
+    program_id: int
+    enrolled_users: int
+    duration_days: int
+    completion_rate_by_day: List[float]
+    activity_completion_rate_by_day: List[float]
+    retention_by_day: List[float]
+    drop_off_distribution: List[int]  # Index 0 is users who never started, index N is last active on day N
+    median_activities_per_user: float
+
+class ProgramSyncItem(ProgramBase):
+    id: int
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class ActivitySyncItem(Activity):
+    updated_at: Optional[datetime] = None
+
+class CompletionSyncItem(BaseModel):
+    id: int
+    activity_id: int
+    completion_date: datetime
+    completed_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class SyncFeed(BaseModel):
+    cursor: str
+    programs: List[ProgramSyncItem] = []
+    activities: List[ActivitySyncItem] = []
+    completions: List[CompletionSyncItem] = []
+
+class SearchResult(BaseModel):
+    kind: str  # "program" or "activity"
+    id: int
+    program_id: int
+    title: str
+    rank: float
+
+class SearchResults(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    results: List[SearchResult]
+
+class DailyProgramStats(BaseModel):
+    day: date
+    completions: int
+    active_users: int
+    minutes: int
+    
+    class Config:
+        from_attributes = True
+
+class CategoryStats(BaseModel):
+    category: str
+    completions: int
+    minutes: int
+
+class ProgramDailyStats(BaseModel):
+    program_id: int
+    start: date
+    end: date
+    days: List[DailyProgramStats]
+    categories: List[CategoryStats]
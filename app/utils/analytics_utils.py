@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database.archive import completion_history
+from app.models.models import Activity, UserProgress
+from app.utils.calendar_utils import get_day_number_from_date
+
+def _as_datetime(value) -> datetime:
+    # func.date() returns a string on SQLite and a date on PostgreSQL
+    return datetime.fromisoformat(str(value))
+
+def load_enrollments(db: Session, program_id: int) -> Dict[int, datetime]:
+    """Map each enrolled user to the start date of their latest enrollment.
+
+    Enrollments without a start date cannot be placed on the program's days and are left out.
+    """
+    rows = db.execute(
+        select(UserProgress.user_id, func.max(UserProgress.start_date))
+        .where(UserProgress.program_id == program_id, UserProgress.start_date.isnot(None))
+        .group_by(UserProgress.user_id)
+    )
+    return {user_id: _as_datetime(start_date) for user_id, start_date in rows}
+
+def load_completion_matrix(db: Session, program_id: int, duration_days: int) -> Tuple[List[int], np.ndarray]:
+    """Build a users x days matrix of completion counts from one grouped query"""
+    enrollments = load_enrollments(db, program_id)
+    user_ids = sorted(enrollments)
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    matrix = np.zeros((len(user_ids), duration_days), dtype=np.int32)
+    if not user_ids:
+        return user_ids, matrix
+
+    history = completion_history()
+    completion_day = func.date(history.c.completion_date)
+    rows = db.execute(
+        select(history.c.user_id, completion_day, func.count())
+        .join(Activity, Activity.id == history.c.activity_id)
+        .where(Activity.program_id == program_id)
+        .group_by(history.c.user_id, completion_day)
+    ).all()
+
+    rows_idx, days_idx, counts = [], [], []
+    for user_id, day, count in rows:
+        if user_id not in user_index:
+            continue
+        day_number = get_day_number_from_date(enrollments[user_id], _as_datetime(day))
+        if 1 <= day_number <= duration_days:
+            rows_idx.append(user_index[user_id])
+            days_idx.append(day_number - 1)
+            counts.append(count)
+    np.add.at(matrix, (np.array(rows_idx, dtype=np.intp), np.array(days_idx, dtype=np.intp)), counts)
+    return user_ids, matrix
+
+def load_activities_per_day(db: Session, program_id: int, duration_days: int) -> np.ndarray:
+    """Number of scheduled activities for each program day"""
+    per_day = np.zeros(duration_days, dtype=np.int32)
+    rows = db.execute(
+        select(Activity.day_number, func.count())
+        .where(Activity.program_id == program_id)
+        .group_by(Activity.day_number)
+    )
+    for day_number, count in rows:
+        if day_number is not None and 1 <= day_number <= duration_days:
+            per_day[day_number - 1] = count
+    return per_day
+
+def _percent(numerator: np.ndarray, denominator) -> List[float]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(denominator > 0, numerator / denominator * 100, 0.0)
+    return np.round(rate, 2).tolist()
+
+def compute_program_metrics(matrix: np.ndarray, activities_per_day: np.ndarray) -> dict:
+    """Funnel and retention metrics computed over the whole matrix at once"""
+    n_users, duration_days = matrix.shape
+    active = matrix > 0
+
+    # Last day with any completion per user; 0 means the user never started
+    any_active = active.any(axis=1)
+    last_day = np.where(any_active, duration_days - np.argmax(active[:, ::-1], axis=1), 0)
+    drop_off = np.bincount(last_day, minlength=duration_days + 1)
+
+    # Users still active on or after each day
+    retained = n_users - np.cumsum(drop_off)[:-1]
+
+    capped = np.minimum(matrix, activities_per_day)
+    per_user_total = matrix.sum(axis=1)
+
+    return {
+        "enrolled_users": int(n_users),
+        "duration_days": int(duration_days),
+        "completion_rate_by_day": _percent(active.sum(axis=0), n_users),
+        "activity_completion_rate_by_day": _percent(capped.sum(axis=0), activities_per_day * n_users),
+        "retention_by_day": _percent(retained, n_users),
+        "drop_off_distribution": drop_off.tolist(),
+        "median_activities_per_user": float(np.median(per_user_total)) if n_users else 0.0,
+    }
@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.database.archive import completion_history
+from app.models.models import Activity
+
+# Number of rows fetched from the cursor and written to the response per chunk
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "completion_id",
+    "user_id",
+    "program_id",
+    "activity_id",
+    "activity_title",
+    "completion_date",
+    "completed_at",
+]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def completion_export_query(user_id: Optional[int] = None, program_id: Optional[int] = None) -> Select:
+    """Build the completion history query, including archived completions, joined with activity titles"""
+    history = completion_history(user_id)
+    stmt = (
+        select(
+            history.c.id.label("completion_id"),
+            history.c.user_id,
+            Activity.program_id,
+            history.c.activity_id,
+            Activity.title.label("activity_title"),
+            history.c.completion_date,
+            history.c.completed_at,
+        )
+        .join(Activity, Activity.id == history.c.activity_id)
+        .order_by(history.c.id)
+    )
+    if program_id is not None:
+        stmt = stmt.where(Activity.program_id == program_id)
+    return stmt
+
+def _serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _encode_ndjson(rows) -> str:
+    lines = []
+    for row in rows:
+        record = {column: _serialize_value(value) for column, value in zip(EXPORT_COLUMNS, row)}
+        lines.append(json.dumps(record))
+    return "\n".join(lines) + "\n"
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_serialize_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def stream_completion_export(sessions: List[Session], stmt: Select, export_format: str) -> Iterator[str]:
+    """Yield the export in chunks, holding at most one chunk of rows in memory"""
+    encode = _encode_csv if export_format == "csv" else _encode_ndjson
+    if export_format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+    # yield_per streams from a server-side cursor where the driver supports it.
+    # Sessions are closed here because the response body outlives the request dependency.
+    try:
+        for db in sessions:
+            result = db.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            for partition in result.partitions():
+                yield encode(partition)
+    finally:
+        for db in sessions:
+            db.close()
@@ -0,0 +1,41 @@
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException, Query
+
+ACTIVITY_FIELDS = ["id", "program_id", "title", "description", "day_number", "duration_minutes", "category"]
+# "activities" returns whole activities; "activities.<field>" limits them to the named fields
+PROGRAM_FIELDS = (
+    ["id", "name", "description", "duration_days", "created_at", "activities"]
+    + [f"activities.{field}" for field in ACTIVITY_FIELDS]
+)
+PLAN_ACTIVITY_FIELDS = ACTIVITY_FIELDS + ["is_completed", "completed_at"]
+
+class FieldSelector:
+    """Dependency parsing a comma-separated `fields=` query parameter.
+
+    Resolves to None when the parameter is absent (full response), otherwise to
+    the requested fields in their canonical order.
+    """
+
+    def __init__(self, allowed: Sequence[str]):
+        self.allowed = list(allowed)
+
+    def __call__(
+        self,
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title")
+    ) -> Optional[List[str]]:
+        if not fields:
+            return None
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - set(self.allowed)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return [field for field in self.allowed if field in requested]
+
+def nested_fields(fields: Sequence[str], prefix: str) -> List[str]:
+    """The fields selected under `prefix.`, without the prefix"""
+    return [field[len(prefix) + 1:] for field in fields if field.startswith(prefix + ".")]
+
+def pick_fields(row, fields: Sequence[str]) -> dict:
+    """Copy the named attributes from an ORM object or result row"""
+    return {field: getattr(row, field) for field in fields}
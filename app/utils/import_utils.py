@@ -0,0 +1,112 @@
+import logging
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.database.versioning import reserve_versions
+from app.models.models import Program, Activity, SyncCounter
+from app.schemas.schemas import ProgramImport, ProgramImportResult, ImportLineError, ImportSummary
+
+logger = logging.getLogger(__name__)
+
+# Number of NDJSON lines validated and imported together
+IMPORT_BATCH_SIZE = 100
+
+def import_program(db: Session, program: ProgramImport) -> ProgramImportResult:
+    """Insert a program and all of its activities in a single transaction"""
+    try:
+        # Core inserts bypass the ORM flush hooks, so reserve sync versions up front
+        version = reserve_versions(db.connection(), SyncCounter.__table__, 1 + len(program.activities))
+        result = db.execute(
+            insert(Program).values(
+                name=program.name,
+                description=program.description,
+                duration_days=program.duration_days,
+                version=version
+            )
+        )
+        program_id = result.inserted_primary_key[0]
+
+        if program.activities:
+            # One executemany for all activities instead of a commit per activity
+            db.execute(
+                insert(Activity),
+                [
+                    {"program_id": program_id, "version": version + offset, **activity.model_dump()}
+                    for offset, activity in enumerate(program.activities, start=1)
+                ]
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return ProgramImportResult(
+        program_id=program_id,
+        name=program.name,
+        activities_created=len(program.activities)
+    )
+
+def iter_ndjson_batches(lines: Iterable[str], batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[List[Tuple[int, str]]]:
+    """Group non-blank NDJSON lines into numbered batches"""
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        batch.append((line_number, line))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def aiter_ndjson_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a streamed request body into lines without buffering the whole body"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+def import_batch(db: Session, batch: List[Tuple[int, str]], summary: ImportSummary) -> None:
+    """Validate a batch of NDJSON lines, then import the valid programs"""
+    valid = []
+    for line_number, line in batch:
+        try:
+            valid.append((line_number, ProgramImport.model_validate_json(line)))
+        except ValidationError as exc:
+            summary.errors.append(ImportLineError(line=line_number, detail=str(exc)))
+
+    for line_number, program in valid:
+        try:
+            result = import_program(db, program)
+        except Exception as exc:
+            summary.errors.append(ImportLineError(line=line_number, detail=str(exc)))
+            continue
+        summary.programs.append(result)
+        summary.programs_created += 1
+        summary.activities_created += result.activities_created
+
+    logger.info(
+        "Imported %d programs (%d activities), %d errors so far",
+        summary.programs_created, summary.activities_created, len(summary.errors)
+    )
+
+def import_ndjson(
+    db: Session,
+    lines: Iterable[str],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    on_batch: Optional[Callable[[int, ImportSummary], None]] = None
+) -> ImportSummary:
+    """Import a stream of NDJSON programs batch by batch, reporting progress after each batch"""
+    summary = ImportSummary()
+    for batch in iter_ndjson_batches(lines, batch_size):
+        import_batch(db, batch, summary)
+        if on_batch:
+            on_batch(batch[-1][0], summary)
+    return summary
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Events kept per subscriber before the oldest are dropped
+MAX_PENDING_EVENTS = 100
+
+class Subscription:
+    """A single subscriber's bounded event buffer.
+
+    Events may be pushed from any thread. Events sharing a coalesce key replace
+    each other, and once the buffer is full the oldest events are dropped; the
+    subscriber is told how many it missed so it can re-fetch instead.
+    """
+
+    def __init__(self, channel: str, loop: asyncio.AbstractEventLoop, max_pending: int = MAX_PENDING_EVENTS):
+        self.channel = channel
+        self._loop = loop
+        self._max_pending = max_pending
+        self._pending: "OrderedDict[object, dict]" = OrderedDict()
+        self._dropped = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict) -> None:
+        with self._lock:
+            key = event.get("coalesce_key")
+            if key is None:
+                self._sequence += 1
+                key = ("seq", self._sequence)
+            if key in self._pending:
+                # Newer state for the same key replaces the queued event
+                self._pending.pop(key)
+            elif len(self._pending) >= self._max_pending:
+                self._pending.popitem(last=False)
+                self._dropped += 1
+            self._pending[key] = event
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The subscriber's event loop has already shut down
+            pass
+
+    async def next_batch(self, timeout: float) -> Tuple[List[dict], int]:
+        """Wait up to `timeout` seconds and return (events, dropped_count)"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return [], 0
+        with self._lock:
+            self._ready.clear()
+            events = list(self._pending.values())
+            self._pending.clear()
+            dropped, self._dropped = self._dropped, 0
+        return events, dropped
+
+class Broadcaster(ABC):
+    """Carries published events to every worker process.
+
+    Implementations call `deliver(channel, event)` in each worker when an event
+    arrives; the default LocalBroadcaster only reaches the current process.
+    """
+
+    def start(self, deliver: Callable[[str, dict], None]) -> None:
+        self._deliver = deliver
+
+    @abstractmethod
+    def publish(self, channel: str, event: dict) -> None:
+        ...
+
+    def stop(self) -> None:
+        pass
+
+class LocalBroadcaster(Broadcaster):
+    def publish(self, channel: str, event: dict) -> None:
+        self._deliver(channel, event)
+
+class Broker:
+    """In-process pub/sub that fans events out to local subscriptions"""
+
+    def __init__(self, broadcaster: Optional[Broadcaster] = None):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.set_broadcaster(broadcaster or LocalBroadcaster())
+
+    @property
+    def broadcaster(self) -> Broadcaster:
+        return self._broadcaster
+
+    def set_broadcaster(self, broadcaster: Broadcaster) -> None:
+        self._broadcaster = broadcaster
+        broadcaster.start(self.deliver)
+
+    def subscribe(self, channel: str, max_pending: int = MAX_PENDING_EVENTS) -> Subscription:
+        subscription = Subscription(channel, asyncio.get_running_loop(), max_pending)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel: str, event: dict) -> None:
+        try:
+            self._broadcaster.publish(channel, event)
+        except Exception:
+            # Live updates are best effort and must never fail the write that triggered them
+            logger.exception("Failed to publish event on %s", channel)
+
+    def deliver(self, channel: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.push(event)
+
+def format_sse(event_type: str, data: dict) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+broker = Broker()
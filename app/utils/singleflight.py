@@ -0,0 +1,67 @@
+"""Single-flight coalescing of identical concurrent reads.
+
+The first caller for a key runs the lookup; callers arriving while it is in
+flight wait for it and share its result (or its exception) instead of running
+the same query again. Nothing is cached: once the call finishes, the next
+caller for the key starts a fresh one. Shared results are handed to several
+requests at once, so lookups must return values nobody mutates and that do
+not depend on the leader's session (records, schemas, plain dicts).
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.config import SINGLE_FLIGHT_TIMEOUT_SECONDS
+
+class SingleFlightTimeout(TimeoutError):
+    """A waiter gave up on the in-flight call for its key"""
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self, timeout: float = SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.leaders_total = 0
+        self.shared_total = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() for `key`, or wait for the run already in flight and share its outcome"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders_total += 1
+            else:
+                call.waiters += 1
+                self.shared_total += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as exc:
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(self.timeout):
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight call {key!r}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+# Shared by the read endpoints
+reads = SingleFlight()
@@ -0,0 +1,55 @@
+from typing import Iterable, List
+
+# A UserProgress completion mask stores one bit per program day:
+# bit N-1 is set once any activity has been completed on day N.
+
+# Days a signed 64-bit BIGINT column can hold without touching the sign bit
+MASK_DAYS = 63
+
+def tracks_streaks(duration_days: int) -> bool:
+    """Whether every day of a program this long fits in the completion mask"""
+    return duration_days <= MASK_DAYS
+
+def day_bit(day_number: int) -> int:
+    """Bit for a specific program day"""
+    if not 1 <= day_number <= MASK_DAYS:
+        raise ValueError(f"Day {day_number} is outside the {MASK_DAYS} days a completion mask holds")
+    return 1 << (day_number - 1)
+
+def compute_completion_mask(day_numbers: Iterable[int], duration_days: int) -> int:
+    """Build a completion mask from program day numbers, ignoring days outside the program or the mask"""
+    mask = 0
+    for day_number in day_numbers:
+        if 1 <= day_number <= min(duration_days, MASK_DAYS):
+            mask |= day_bit(day_number)
+    return mask
+
+def count_completed_days(mask: int) -> int:
+    """Number of days with at least one completion"""
+    return bin(mask).count("1")
+
+def longest_streak(mask: int) -> int:
+    """Length of the longest run of consecutive completed days"""
+    # Each AND with the shifted mask shortens every run by one day
+    streak = 0
+    while mask:
+        mask &= mask >> 1
+        streak += 1
+    return streak
+
+def current_streak(mask: int, day_number: int) -> int:
+    """Run of completed days ending today, or yesterday if today is not completed yet"""
+    if day_number < 1:
+        return 0
+    day_number = min(day_number, MASK_DAYS)
+    if not mask & day_bit(day_number):
+        day_number -= 1
+    if day_number < 1:
+        return 0
+    window = (1 << day_number) - 1
+    # The highest missed day below the end of the run bounds the streak
+    return day_number - ((~mask & window).bit_length())
+
+def completion_heatmap(mask: int, duration_days: int) -> List[bool]:
+    """Per-day completion flags for calendar rendering"""
+    return [bool(mask >> day & 1) for day in range(duration_days)]
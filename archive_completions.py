@@ -0,0 +1,27 @@
+"""Move completions of finished enrollments into the archive table.
+
+An enrollment is finished when it is inactive or past its program's duration.
+Run it periodically, e.g. nightly: python archive_completions.py [--batch-size 500]
+"""
+import argparse
+
+from app.database.archive import ARCHIVE_BATCH_SIZE, archive_finished_enrollments
+from app.database.database import Base, SessionLocal, engine
+from app.database.sharding import user_sessions
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive completions of finished enrollments")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        with user_sessions(db) as user_dbs:
+            moved = sum(archive_finished_enrollments(user_db, batch_size=args.batch_size) for user_db in user_dbs)
+    finally:
+        db.close()
+    print(f"✅ Archived {moved} completions.")
+
+if __name__ == "__main__":
+    main()
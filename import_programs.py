@@ -0,0 +1,43 @@
+"""Bulk-import programs from an NDJSON file.
+
+Each line is a program with its activities, e.g.
+{"name": "...", "description": "...", "duration_days": 30, "activities": [{"title": "...", ...}]}
+
+Usage: python import_programs.py programs.ndjson [--batch-size 100]
+"""
+import argparse
+import sys
+
+from app.database.database import Base, SessionLocal, engine
+from app.schemas.schemas import ImportSummary
+from app.utils.import_utils import IMPORT_BATCH_SIZE, import_ndjson
+
+def report_progress(line_number: int, summary: ImportSummary):
+    print(
+        f"... line {line_number}: {summary.programs_created} programs, "
+        f"{summary.activities_created} activities, {len(summary.errors)} errors"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import programs from NDJSON")
+    parser.add_argument("path", help="NDJSON file to import, or - for stdin")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    try:
+        summary = import_ndjson(db, source, args.batch_size, on_batch=report_progress)
+    finally:
+        db.close()
+        if source is not sys.stdin:
+            source.close()
+
+    for error in summary.errors:
+        print(f"❌ line {error.line}: {error.detail}")
+    print(f"✅ Imported {summary.programs_created} programs with {summary.activities_created} activities.")
+    return 1 if summary.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Move user rows after the shard list changes.
+
+Users are placed by hashing their id over the shard list, so adding or removing a
+shard moves some of them. For every user whose shard changes, the user's rows are
+copied to the new shard and then deleted from the old one. Re-running after an
+interruption is safe: the copy replaces whatever the target already holds.
+
+Rows keep their ids (shards hand out ids from disjoint ranges, and archived
+completions must keep the id of the original) but get fresh change versions
+from the target shard's counter, since versions are per shard.
+
+The move runs in a maintenance window kept in the catalog's shard_rebalance
+table: once it is opened, the API answers user-scoped requests with 503, and
+the script waits --drain-seconds for requests already in flight before moving
+anything. When the move finishes, workers restarted with the new
+PRODIGY_SHARD_URLS serve again while workers still on the old list keep
+answering 503. Once every worker runs the new list, close the window with
+--clear.
+
+Usage: python rebalance_shards.py --from sqlite:///shard0.db sqlite:///shard1.db \
+                                  --to sqlite:///shard0.db sqlite:///shard1.db sqlite:///shard2.db
+       python rebalance_shards.py --clear
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, delete, func, insert, select, union, update
+
+from app.config import DATABASE_URL
+from app.database.database import Base
+from app.database.sharding import USER_SCOPED_TABLES, ShardRouter, format_shard_tags, shard_index, shard_tag
+from app.database.versioning import reserve_versions
+from app.models.models import ShardRebalance
+
+# Longer than any request that may still be using the old shard list when the window opens
+DRAIN_SECONDS = 30
+
+# The change version each user-scoped table carries
+VERSION_COLUMNS = {
+    "user_progress": "enrolled_version",
+    "user_activity_completions": "version",
+    "user_activity_completions_archive": "version",
+}
+
+def _user_ids(connection, tables):
+    return connection.scalars(union(*[select(table.c.user_id) for table in tables])).all()
+
+def _copy_rows(dst, table, user_id: int, rows) -> None:
+    """Replace the user's rows in `table` on the target, keeping ids and re-stamping versions"""
+    dst.execute(delete(table).where(table.c.user_id == user_id))
+    if not rows:
+        return
+    ids = [row["id"] for row in rows]
+    taken = dst.scalar(select(func.count()).select_from(table).where(table.c.id.in_(ids)))
+    if taken:
+        # Only possible for rows created before shards had their own id ranges
+        raise RuntimeError(f"{taken} {table.name} ids of user {user_id} are already used on the target shard")
+    column = VERSION_COLUMNS[table.name]
+    first_version = reserve_versions(dst, Base.metadata.tables["sync_counter"], len(rows))
+    dst.execute(insert(table), [
+        {**row, column: first_version + offset} for offset, row in enumerate(rows)
+    ])
+
+def _open_window(catalog, new_urls) -> None:
+    """Start (or restart, after an interruption) the maintenance window for a move to `new_urls`"""
+    Base.metadata.create_all(bind=catalog, tables=[ShardRebalance.__table__])
+    tags = format_shard_tags([shard_tag(url) for url in new_urls])
+    with catalog.begin() as connection:
+        connection.execute(delete(ShardRebalance).where(ShardRebalance.id == 1))
+        connection.execute(insert(ShardRebalance).values(id=1, shard_tags=tags, finished=False))
+
+def clear_window(catalog_url: str = DATABASE_URL) -> None:
+    """End the maintenance window once every worker runs the new shard list"""
+    catalog = create_engine(catalog_url)
+    try:
+        with catalog.begin() as connection:
+            connection.execute(delete(ShardRebalance).where(ShardRebalance.id == 1))
+    finally:
+        catalog.dispose()
+
+def rebalance(old_urls, new_urls, catalog_url: str = DATABASE_URL, drain_seconds: float = DRAIN_SECONDS) -> int:
+    """Move every user whose shard changed; returns the number of users moved"""
+    urls = set(old_urls) | set(new_urls)
+    if len({shard_tag(url) for url in urls}) != len(urls):
+        raise ValueError("Shard URLs must point at distinct databases with distinct tags")
+    ShardRouter(new_urls, catalog_url=catalog_url).create_all()
+    tables = [Base.metadata.tables[name] for name in USER_SCOPED_TABLES]
+    catalog = create_engine(catalog_url)
+    engines = {url: create_engine(url) for url in urls}
+    moved = 0
+    try:
+        _open_window(catalog, new_urls)
+        time.sleep(drain_seconds)
+        for source_url in old_urls:
+            source = engines[source_url]
+            with source.connect() as connection:
+                user_ids = _user_ids(connection, tables)
+            for user_id in user_ids:
+                target_url = new_urls[shard_index(user_id, len(new_urls))]
+                if target_url == source_url:
+                    continue
+                with source.connect() as src, engines[target_url].begin() as dst:
+                    for table in tables:
+                        rows = src.execute(select(table).where(table.c.user_id == user_id)).mappings().all()
+                        _copy_rows(dst, table, user_id, [dict(row) for row in rows])
+                # Delete only once the copy is committed
+                with source.begin() as src:
+                    for table in tables:
+                        src.execute(delete(table).where(table.c.user_id == user_id))
+                moved += 1
+        # Left unfinished on failure, so the API keeps refusing user rows until a re-run completes
+        with catalog.begin() as connection:
+            connection.execute(update(ShardRebalance).where(ShardRebalance.id == 1).values(finished=True))
+    finally:
+        catalog.dispose()
+        for engine in engines.values():
+            engine.dispose()
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description="Move user rows to their shard under a new shard list")
+    parser.add_argument("--from", dest="old_urls", nargs="+", help="Current shard URLs, in order")
+    parser.add_argument("--to", dest="new_urls", nargs="+", help="New shard URLs, in order")
+    parser.add_argument("--drain-seconds", type=float, default=DRAIN_SECONDS,
+                        help="Wait for in-flight requests after opening the maintenance window")
+    parser.add_argument("--clear", action="store_true",
+                        help="End the maintenance window once every worker runs the new shard list")
+    args = parser.parse_args()
+
+    if args.clear:
+        clear_window()
+        print("✅ Maintenance window closed.")
+        return
+    if not args.old_urls or not args.new_urls:
+        parser.error("--from and --to are required")
+    moved = rebalance(args.old_urls, args.new_urls, drain_seconds=args.drain_seconds)
+    print(f"✅ Moved {moved} users. Restart the workers with the new PRODIGY_SHARD_URLS, then run --clear.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Incrementally refresh the daily aggregate tables from new completions.
+
+Only completions added since the previous run are read. Schedule it (e.g. nightly
+from cron), or set PRODIGY_ROLLUP_INTERVAL_SECONDS to run it inside the API process.
+
+Usage: python run_rollups.py
+"""
+from app.database.database import Base, SessionLocal, engine
+from app.database.rollups import run_rollups
+from app.database.sharding import user_sessions
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        with user_sessions(db) as user_dbs:
+            refreshed = run_rollups(db, user_dbs)
+    finally:
+        db.close()
+    print(f"✅ Refreshed {refreshed} program days.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware.admission import AdmissionControlMiddleware, AdmissionGate, classify_request, render_metrics
+
+class TestAdmissionControl:
+
+    def test_gate_queues_then_sheds(self):
+        async def scenario():
+            gate = AdmissionGate("write", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+            assert await gate.acquire()
+            waiter = asyncio.ensure_future(gate.acquire())
+            await asyncio.sleep(0)
+            assert gate.waiting == 1
+            assert not await gate.acquire()  # Queue full
+            assert not await waiter  # Deadline passed while queued
+            gate.release()
+            assert await gate.acquire()
+            gate.release()
+            return gate
+
+        gate = asyncio.run(scenario())
+        assert (gate.admitted_total, gate.shed_queue_full_total, gate.shed_timeout_total) == (2, 1, 1)
+        assert 'prodigy_admission_shed_total{route_class="write",reason="timeout"} 1' in render_metrics({"write": gate})
+
+    def test_middleware_returns_503_with_retry_after(self):
+        app = FastAPI()
+
+        @app.post("/complete")
+        def complete():
+            return {"ok": True}
+
+        @app.get("/plan")
+        def plan():
+            return {"ok": True}
+
+        gates = {
+            "read": AdmissionGate("read", max_concurrent=4, max_queue=4, queue_timeout=1),
+            "write": AdmissionGate("write", max_concurrent=0, max_queue=0, queue_timeout=1),
+        }
+        app.add_middleware(AdmissionControlMiddleware, gates=gates, retry_after_seconds=3)
+        client = TestClient(app)
+
+        response = client.post("/complete")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert client.get("/plan").status_code == 200
+        assert gates["read"].in_flight == 0
+
+    def test_metrics_endpoint(self, client):
+        client.get("/")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert 'prodigy_admission_admitted_total{route_class="read"}' in response.text
+
+    def test_exports_have_their_own_class(self):
+        def classify(method, path):
+            return classify_request({"method": method, "path": path})
+
+        assert classify("GET", "/api/v1/programs/1/completions/export") == "export"
+        assert classify("GET", "/api/v1/users/1/completions/export") == "export"
+        assert classify("GET", "/api/v1/users/1/completions") == "read"
+        assert classify("POST", "/api/v1/users/1/complete-activity") == "write"
+        assert classify("GET", "/api/v1/users/1/events") is None
@@ -0,0 +1,66 @@
+from datetime import datetime
+from app.models.models import Program, Activity, User, UserProgress, UserActivityCompletion
+
+class TestProgramAnalytics:
+
+    def test_program_analytics(self, client, db_session):
+        program = Program(name="Analytics Program", description="Funnel", duration_days=5)
+        users = [User(username=f"learner{i}", email=f"learner{i}@example.com") for i in range(3)]
+        db_session.add(program)
+        db_session.add_all(users)
+        db_session.commit()
+        program_id = program.id
+
+        activities = [
+            Activity(program_id=program_id, title=f"Day {day}", description="", day_number=day, category="Reading")
+            for day in range(1, 6)
+        ]
+        db_session.add_all(activities)
+        start = datetime(2025, 3, 1)
+        for user in users:
+            db_session.add(UserProgress(user_id=user.id, program_id=program_id, start_date=start, is_active=True))
+        db_session.commit()
+
+        # learner0 completes days 1-3, learner1 completes day 1, learner2 never starts
+        for day in range(1, 4):
+            db_session.add(UserActivityCompletion(
+                user_id=users[0].id, activity_id=activities[day - 1].id, completion_date=datetime(2025, 3, day)
+            ))
+        db_session.add(UserActivityCompletion(
+            user_id=users[1].id, activity_id=activities[0].id, completion_date=datetime(2025, 3, 1, 18, 30)
+        ))
+        db_session.commit()
+
+        response = client.get(f"/api/v1/programs/{program_id}/analytics")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["enrolled_users"] == 3
+        assert data["completion_rate_by_day"] == [66.67, 33.33, 33.33, 0.0, 0.0]
+        assert data["drop_off_distribution"] == [1, 1, 0, 1, 0, 0]
+        assert data["retention_by_day"] == [66.67, 33.33, 33.33, 0.0, 0.0]
+        assert data["median_activities_per_user"] == 1.0
+
+    def test_undated_enrollments_are_skipped(self, client, db_session):
+        program = Program(name="Undated Analytics", description="", duration_days=3)
+        dated = User(username="dated", email="dated@example.com")
+        undated = User(username="undated", email="undated@example.com")
+        db_session.add_all([program, dated, undated])
+        db_session.commit()
+        activity = Activity(program_id=program.id, title="Day 1", description="", day_number=1, category="Reading")
+        db_session.add(activity)
+        db_session.add_all([
+            UserProgress(user_id=dated.id, program_id=program.id, start_date=datetime(2025, 3, 1), is_active=True),
+            UserProgress(user_id=undated.id, program_id=program.id, start_date=None, is_active=True),
+        ])
+        db_session.commit()
+        db_session.add(UserActivityCompletion(user_id=undated.id, activity_id=activity.id,
+                                              completion_date=datetime(2025, 3, 1)))
+        db_session.commit()
+
+        response = client.get(f"/api/v1/programs/{program.id}/analytics")
+        assert response.status_code == 200
+        assert response.json()["enrolled_users"] == 1
+
+    def test_analytics_unknown_program(self, client):
+        response = client.get("/api/v1/programs/999999/analytics")
+        assert response.status_code == 404
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.database import repository
+from app.database.archive import archive_finished_enrollments
+from app.models.models import (
+    Program, Activity, User, UserProgress, UserActivityCompletion, ArchivedActivityCompletion
+)
+
+class TestCompletionArchive:
+
+    def seed(self, db_session):
+        program = Program(name="Archive Program", description="Old", duration_days=30)
+        users = [User(username=f"archiver{i}", email=f"archiver{i}@example.com") for i in range(2)]
+        db_session.add(program)
+        db_session.add_all(users)
+        db_session.commit()
+        activity = Activity(program_id=program.id, title="Walk", description="", day_number=1, category="Exercise")
+        db_session.add(activity)
+        # users[0] finished long ago, users[1] is still mid-program
+        db_session.add(UserProgress(user_id=users[0].id, program_id=program.id,
+                                    start_date=datetime(2025, 1, 1), is_active=True))
+        db_session.add(UserProgress(user_id=users[1].id, program_id=program.id,
+                                    start_date=datetime(2025, 3, 1), is_active=True))
+        db_session.commit()
+        for user in users:
+            for day in range(1, 4):
+                db_session.add(UserActivityCompletion(
+                    user_id=user.id, activity_id=activity.id, completion_date=datetime(2025, user.id, day)
+                ))
+        db_session.commit()
+        return program.id, [user.id for user in users]
+
+    def test_archive_moves_finished_enrollments_in_batches(self, db_session):
+        _, (finished_id, active_id) = self.seed(db_session)
+
+        moved = archive_finished_enrollments(db_session, now=datetime(2025, 3, 10), batch_size=2)
+        assert moved == 3
+        assert db_session.query(UserActivityCompletion).filter_by(user_id=finished_id).count() == 0
+        assert db_session.query(ArchivedActivityCompletion).filter_by(user_id=finished_id).count() == 3
+        assert db_session.query(UserActivityCompletion).filter_by(user_id=active_id).count() == 3
+
+        # Running again is a no-op
+        assert archive_finished_enrollments(db_session, now=datetime(2025, 3, 10)) == 0
+
+    def test_historical_reads_include_archive(self, client, db_session):
+        program_id, (finished_id, _) = self.seed(db_session)
+        archive_finished_enrollments(db_session, now=datetime(2025, 3, 10))
+
+        export = client.get(f"/api/v1/users/{finished_id}/completions/export").text.splitlines()
+        assert len(export) == 3
+        program_export = client.get(f"/api/v1/programs/{program_id}/completions/export").text.splitlines()
+        assert len(program_export) == 6
+        summary = client.get(f"/api/v1/users/{finished_id}/programs/{program_id}/progress-summary").json()
+        assert summary["completed_activities"] == 3
+
+    def test_plans_and_duplicate_checks_include_archive(self, client, db_session):
+        program_id, (finished_id, _) = self.seed(db_session)
+        activity_id = db_session.query(Activity).filter_by(program_id=program_id).one().id
+        archive_finished_enrollments(db_session, now=datetime(2025, 3, 10))
+
+        plan = client.get(f"/api/v1/users/{finished_id}/programs/{program_id}/day-plan",
+                          params={"date": "2025-01-01"}).json()
+        assert plan["completed_activities"] == 1
+        week = client.get(f"/api/v1/users/{finished_id}/programs/{program_id}/week-plan",
+                          params={"week": 1}).json()
+        assert week["days"][0]["activities"][0]["is_completed"] is True
+
+        # Already completed (and archived) for that date
+        response = client.post(f"/api/v1/users/{finished_id}/complete-activity",
+                               json={"activity_id": activity_id, "completion_date": "2025-01-01T00:00:00"})
+        assert response.status_code == 400
+        assert db_session.query(UserActivityCompletion).filter_by(user_id=finished_id).count() == 0
+
+        sync = client.get(f"/api/v1/users/{finished_id}/sync").json()
+        assert len(sync["completions"]) == 3
+
+    def test_recent_completions_stay_hot(self, db_session):
+        _, (finished_id, _) = self.seed(db_session)
+        activity_id = db_session.query(Activity).one().id
+        db_session.add(UserActivityCompletion(user_id=finished_id, activity_id=activity_id,
+                                              completion_date=datetime(2025, 3, 1)))
+        db_session.commit()
+
+        assert archive_finished_enrollments(db_session, now=datetime(2025, 3, 10)) == 3
+        hot = db_session.query(UserActivityCompletion).filter_by(user_id=finished_id).all()
+        assert [completion.completion_date for completion in hot] == [datetime(2025, 3, 1)]
+
+    def test_recent_reads_skip_archive(self, db_engine, db_session):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            today = datetime.combine(datetime.now().date(), datetime.min.time())
+            repository.get_completions_in_range(db_session, 1, today, today + timedelta(days=1))
+            repository.completion_exists(db_session, 1, 1, today, today + timedelta(days=1))
+            assert not any("user_activity_completions_archive" in statement for statement in statements)
+
+            repository.get_completions_in_range(db_session, 1, datetime(2025, 1, 1), datetime(2025, 1, 2))
+            assert "user_activity_completions_archive" in statements[-1]
+        finally:
+            event.remove(db_engine, "before_cursor_execute", record)
@@ -0,0 +1,47 @@
+from datetime import datetime
+from app.models.models import Program, User, UserProgress
+from app.schemas.schemas import MAX_COHORT_SIZE
+
+class TestCohortEnrollment:
+
+    def test_enroll_cohort_skips_existing_and_unknown(self, client, db_session):
+        program = Program(name="Cohort Program", description="Onboarding", duration_days=30)
+        users = [User(username=f"member{i}", email=f"member{i}@example.com") for i in range(5)]
+        db_session.add(program)
+        db_session.add_all(users)
+        db_session.commit()
+        db_session.add(UserProgress(
+            user_id=users[0].id, program_id=program.id, start_date=datetime(2025, 1, 1), is_active=True
+        ))
+        db_session.commit()
+        program_id = program.id
+
+        user_ids = [user.id for user in users] + [users[1].id, 999999]
+        response = client.post(
+            f"/api/v1/programs/{program_id}/enroll",
+            json={"user_ids": user_ids, "start_date": "2025-02-01T00:00:00"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["requested"] == 6
+        assert data["enrolled"] == 4
+        assert data["already_enrolled"] == 1
+        assert data["unknown_user_ids"] == [999999]
+        assert db_session.query(UserProgress).filter(UserProgress.program_id == program_id).count() == 5
+
+    def test_enroll_cohort_unknown_program(self, client):
+        response = client.post(
+            "/api/v1/programs/999999/enroll",
+            json={"user_ids": [1], "start_date": "2025-02-01T00:00:00"}
+        )
+        assert response.status_code == 404
+
+    def test_enroll_cohort_rejects_oversized_lists(self, client, db_session):
+        program = Program(name="Huge Cohort", description="Too many", duration_days=30)
+        db_session.add(program)
+        db_session.commit()
+        response = client.post(
+            f"/api/v1/programs/{program.id}/enroll",
+            json={"user_ids": list(range(1, MAX_COHORT_SIZE + 2)), "start_date": "2025-02-01T00:00:00"}
+        )
+        assert response.status_code == 422
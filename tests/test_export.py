@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+from datetime import datetime
+from app.models.models import Program, Activity, User, UserActivityCompletion
+
+def seed_completions(db_session, count=5):
+    program = Program(name="Export Program", description="Export test", duration_days=30)
+    user = User(username="exporter", email="exporter@example.com")
+    db_session.add_all([program, user])
+    db_session.commit()
+
+    activity = Activity(
+        program_id=program.id, title="Stretch", description="Stretch for 5 minutes",
+        day_number=1, duration_minutes=5, category="Exercise"
+    )
+    db_session.add(activity)
+    db_session.commit()
+
+    for i in range(count):
+        db_session.add(UserActivityCompletion(
+            user_id=user.id, activity_id=activity.id, completion_date=datetime(2025, 1, i + 1)
+        ))
+    db_session.commit()
+    return user.id, program.id
+
+class TestCompletionExport:
+
+    def test_user_export_ndjson(self, client, db_session):
+        user_id, program_id = seed_completions(db_session)
+
+        response = client.get(f"/api/v1/users/{user_id}/completions/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 5
+        assert rows[0]["activity_title"] == "Stretch"
+        assert rows[0]["program_id"] == program_id
+        assert rows[0]["completion_date"] == "2025-01-01T00:00:00"
+
+    def test_program_export_csv(self, client, db_session):
+        user_id, program_id = seed_completions(db_session, count=3)
+
+        response = client.get(f"/api/v1/programs/{program_id}/completions/export?format=csv")
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 3
+        assert {row["user_id"] for row in rows} == {str(user_id)}
+
+    def test_export_invalid_format(self, client):
+        response = client.get("/api/v1/users/1/completions/export?format=xml")
+        assert response.status_code == 422
@@ -0,0 +1,72 @@
+from datetime import datetime
+from sqlalchemy import event
+from app.models.models import Program, Activity, User, UserProgress
+
+class TestFieldSelection:
+
+    def seed(self, db_session):
+        program = Program(name="Lean Program", description="A long description", duration_days=30)
+        user = User(username="lean", email="lean@example.com")
+        db_session.add_all([program, user])
+        db_session.commit()
+        program_id, user_id = program.id, user.id
+        db_session.add_all([
+            Activity(program_id=program_id, title=f"Day {day}", description="Very long text " * 20,
+                     day_number=day, category="Reading")
+            for day in (1, 2)
+        ])
+        db_session.add(UserProgress(user_id=user_id, program_id=program_id,
+                                    start_date=datetime(2025, 6, 1), is_active=True))
+        db_session.commit()
+        return user_id, program_id
+
+    def test_program_fields(self, client, db_session):
+        _, program_id = self.seed(db_session)
+        data = client.get("/api/v1/programs/", params={"fields": "id,name"}).json()
+        assert data == [{"id": program_id, "name": "Lean Program"}]
+
+        data = client.get(f"/api/v1/programs/{program_id}", params={"fields": "name,activities"}).json()
+        assert data["name"] == "Lean Program"
+        assert [a["title"] for a in data["activities"]] == ["Day 1", "Day 2"]
+
+        full = client.get(f"/api/v1/programs/{program_id}").json()
+        assert full["description"] == "A long description"
+
+    def test_nested_activity_fields(self, client, db_engine, db_session):
+        _, program_id = self.seed(db_session)
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            data = client.get("/api/v1/programs/", params={"fields": "name,activities.title"}).json()
+        finally:
+            event.remove(db_engine, "before_cursor_execute", record)
+        assert data == [{"name": "Lean Program", "activities": [{"title": "Day 1"}, {"title": "Day 2"}]}]
+        # Long activity descriptions are never read
+        assert not any("activities.description" in statement for statement in statements)
+
+    def test_activity_fields(self, client, db_session):
+        _, program_id = self.seed(db_session)
+        data = client.get(f"/api/v1/programs/{program_id}/activities",
+                          params={"fields": "title", "day_number": 2}).json()
+        assert data == [{"title": "Day 2"}]
+        full = client.get(f"/api/v1/programs/{program_id}/activities").json()
+        assert len(full) == 2 and "description" in full[0]
+
+    def test_plan_fields(self, client, db_session):
+        user_id, program_id = self.seed(db_session)
+        data = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/day-plan",
+                          params={"date": "2025-06-02", "fields": "id,title,is_completed"}).json()
+        assert set(data["activities"][0]) == {"id", "title", "is_completed"}
+        assert data["total_activities"] == 1
+
+        week = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/week-plan",
+                          params={"week": 1, "fields": "title"}).json()
+        assert week["days"][0]["activities"] == [{"title": "Day 1"}]
+
+    def test_unknown_field(self, client):
+        response = client.get("/api/v1/programs/", params={"fields": "id,secret"})
+        assert response.status_code == 400
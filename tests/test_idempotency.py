@@ -0,0 +1,95 @@
+import uuid
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from app.middleware.idempotency import DatabaseIdempotencyStore, MemoryIdempotencyStore, StoredResponse
+from app.models.models import Program, Activity, User, UserActivityCompletion
+
+class TestIdempotencyKeys:
+
+    def test_retried_completion_is_replayed(self, client, db_session):
+        program = Program(name="Retry Program", description="Flaky network", duration_days=30)
+        user = User(username="retrier", email="retrier@example.com")
+        db_session.add_all([program, user])
+        db_session.commit()
+        activity = Activity(program_id=program.id, title="Stretch", description="", day_number=1,
+                            duration_minutes=5, category="Exercise")
+        db_session.add(activity)
+        db_session.commit()
+        user_id, activity_id = user.id, activity.id
+
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        payload = {"activity_id": activity_id, "completion_date": "2025-05-01T08:00:00"}
+        first = client.post(f"/api/v1/users/{user_id}/complete-activity", json=payload, headers=headers)
+        retry = client.post(f"/api/v1/users/{user_id}/complete-activity", json=payload, headers=headers)
+        assert first.status_code == retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        assert db_session.scalar(select(func.count()).select_from(UserActivityCompletion)) == 1
+
+        # Without a key the duplicate reaches the endpoint as before
+        duplicate = client.post(f"/api/v1/users/{user_id}/complete-activity", json=payload)
+        assert duplicate.status_code == 400
+
+        # Same key, different body
+        payload["completion_date"] = "2025-05-02T08:00:00"
+        conflict = client.post(f"/api/v1/users/{user_id}/complete-activity", json=payload, headers=headers)
+        assert conflict.status_code == 422
+
+    def test_client_errors_are_replayed(self, client):
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        response = client.post("/api/v1/users/", json={"username": "x"}, headers=headers)
+        assert response.status_code == 422
+        replay = client.post("/api/v1/users/", json={"username": "x"}, headers=headers)
+        assert replay.headers["idempotent-replayed"] == "true"
+
+    def test_keys_are_scoped_to_the_caller(self, client):
+        key = str(uuid.uuid4())
+        first = client.post("/api/v1/users/", json={"username": "alice", "email": "alice@example.com"},
+                            headers={"Idempotency-Key": key, "X-Client-Id": "phone-a"})
+        # Another client picking the same key value runs its own request
+        second = client.post("/api/v1/users/", json={"username": "bob", "email": "bob@example.com"},
+                             headers={"Idempotency-Key": key, "X-Client-Id": "phone-b"})
+        assert first.status_code == second.status_code == 200
+        assert "idempotent-replayed" not in second.headers
+        assert second.json()["username"] == "bob"
+
+    def test_memory_store_claims_expires_and_evicts(self):
+        response = StoredResponse("f", 200, [(b"content-type", b"application/json")], b"{}")
+        store = MemoryIdempotencyStore(ttl_seconds=60, max_entries=2)
+        assert store.claim("a", "f") is None
+        assert store.claim("a", "f").pending
+        store.complete("a", response)
+        assert store.claim("a", "f") == response
+        for key in ("b", "c"):
+            store.claim(key, "f")
+        assert store.claim("a", "f") is None  # Evicted, so claimable again
+        store.release("c")
+        assert store.claim("c", "f") is None
+        expired = MemoryIdempotencyStore(ttl_seconds=0)
+        expired.claim("a", "f")
+        expired.complete("a", response)
+        assert expired.claim("a", "f") is None
+
+    def test_database_store_claims_across_workers(self, db_engine):
+        # Two stores on one database stand in for two worker processes
+        first = DatabaseIdempotencyStore(sessionmaker(bind=db_engine), ttl_seconds=60)
+        second = DatabaseIdempotencyStore(sessionmaker(bind=db_engine), ttl_seconds=60)
+        response = StoredResponse("f", 201, [(b"content-type", b"application/json")], b'{"id": 1}')
+
+        assert first.claim("k", "f") is None
+        assert second.claim("k", "f").pending
+        first.complete("k", response)
+        assert second.claim("k", "f") == response
+        assert second.claim("k", "other").fingerprint == "f"
+
+        # A released claim (the request failed) can be taken again
+        assert first.claim("failed", "f") is None
+        first.release("failed")
+        assert second.claim("failed", "f") is None
+
+        # So can one abandoned by a worker that died mid-request
+        abandoned = DatabaseIdempotencyStore(sessionmaker(bind=db_engine), ttl_seconds=60, pending_seconds=-1)
+        assert abandoned.claim("dead", "f") is None
+        assert second.claim("dead", "f") is None
+        assert first.claim("dead", "f").pending
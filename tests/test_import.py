@@ -0,0 +1,41 @@
+import json
+from app.models.models import Activity, Program
+
+def program_payload(name, days=3):
+    return {
+        "name": name,
+        "description": f"{name} description",
+        "duration_days": 30,
+        "activities": [
+            {"title": f"Day {day}", "description": "Do it", "day_number": day, "category": "Exercise"}
+            for day in range(1, days + 1)
+        ]
+    }
+
+class TestProgramImport:
+
+    def test_import_single_program(self, client, db_session):
+        response = client.post("/api/v1/programs/import", json=program_payload("Imported", days=30))
+        assert response.status_code == 200
+        data = response.json()
+        assert data["activities_created"] == 30
+        assert db_session.query(Activity).filter(Activity.program_id == data["program_id"]).count() == 30
+
+    def test_import_ndjson_stream_reports_errors(self, client, db_session):
+        lines = [
+            json.dumps(program_payload("First")),
+            "",
+            json.dumps({"name": "Missing description"}),
+            json.dumps(program_payload("Second", days=2)),
+        ]
+        response = client.post(
+            "/api/v1/programs/import/ndjson?batch_size=2",
+            content="\n".join(lines),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["programs_created"] == 2
+        assert data["activities_created"] == 5
+        assert [error["line"] for error in data["errors"]] == [3]
+        assert db_session.query(Program).count() == 2
@@ -0,0 +1,36 @@
+from app import launcher
+
+class TestLauncher:
+
+    def test_worker_count(self):
+        assert launcher.worker_count(configured=3, cpus=8) == 3
+        assert launcher.worker_count(configured=0, cpus=8) == 8
+        assert launcher.worker_count(configured=0, cpus=0) >= 1
+
+    def test_gunicorn_options(self):
+        options = launcher.gunicorn_options()
+        assert options["preload_app"] is True
+        assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+        assert options["post_fork"] is launcher.post_fork
+        assert options["workers"] >= 1
+
+        application = launcher.ProdigyApplication(options)
+        assert application.cfg.preload_app is True
+        assert application.cfg.max_requests == options["max_requests"]
+
+    def test_post_fork_resets_pools(self):
+        from app.database.database import engine
+        with engine.connect():
+            pass
+        pool = engine.pool
+        launcher.post_fork(server=None, worker=None)
+        assert engine.pool is not pool
+
+    def test_multi_worker_warnings(self, monkeypatch):
+        monkeypatch.setattr(launcher, "IDEMPOTENCY_BACKEND", "memory")
+        assert launcher.multi_worker_warnings(1) == []
+        warnings = launcher.multi_worker_warnings(4)
+        assert any("broadcaster" in warning for warning in warnings)
+        assert any("PRODIGY_IDEMPOTENCY_BACKEND=database" in warning for warning in warnings)
+        monkeypatch.setattr(launcher, "IDEMPOTENCY_BACKEND", "database")
+        assert not any("IDEMPOTENCY" in warning for warning in launcher.multi_worker_warnings(4))
@@ -0,0 +1,49 @@
+from datetime import datetime
+from app.models.models import Program, Activity, User, UserProgress, UserActivityCompletion
+
+class TestPlans:
+
+    def seed(self, db_session):
+        program = Program(name="Plan Program", description="Plans", duration_days=30)
+        user = User(username="planner", email="planner@example.com")
+        db_session.add_all([program, user])
+        db_session.commit()
+        program_id, user_id = program.id, user.id
+        activities = []
+        for day in range(1, 31):
+            for slot in range(2):
+                activities.append(Activity(program_id=program_id, title=f"Day {day} #{slot}", description="",
+                                           day_number=day, category="Exercise"))
+        db_session.add_all(activities)
+        db_session.add(UserProgress(user_id=user_id, program_id=program_id,
+                                    start_date=datetime(2025, 6, 1), is_active=True))
+        db_session.commit()
+        # Complete the first activity of day 15 (2025-06-15) and both of day 16
+        by_title = {activity.title: activity.id for activity in activities}
+        for title, day in (("Day 15 #0", 15), ("Day 16 #0", 16), ("Day 16 #1", 16)):
+            db_session.add(UserActivityCompletion(user_id=user_id, activity_id=by_title[title],
+                                                  completion_date=datetime(2025, 6, day, 9)))
+        db_session.commit()
+        return user_id, program_id
+
+    def test_day_plan(self, client, db_session):
+        user_id, program_id = self.seed(db_session)
+        response = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/day-plan", params={"date": "2025-06-15"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["day_number"] == 15
+        assert [a["is_completed"] for a in data["activities"]] == [True, False]
+        assert data["completion_percentage"] == 50
+
+    def test_week_plan(self, client, db_session):
+        user_id, program_id = self.seed(db_session)
+        response = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/week-plan", params={"week": 3})
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert [day["day_number"] for day in days] == list(range(15, 22))
+        assert [day["completed_activities"] for day in days] == [1, 2, 0, 0, 0, 0, 0]
+
+    def test_last_week_is_truncated(self, client, db_session):
+        user_id, program_id = self.seed(db_session)
+        days = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/week-plan", params={"week": 4}).json()["days"]
+        assert [day["day_number"] for day in days] == list(range(22, 29))
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.middleware.profiling import ProfiledRoute, ProfileStore, ProfilingMiddleware
+
+def build_app(engine, store):
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get("/slow")
+    def slow():
+        with engine.connect() as connection:
+            total = connection.execute(text("SELECT 40 + 2")).scalar()
+        payload = [{"value": i} for i in range(1000)]
+        return {"total": total, "size": len(payload)}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, token="secret", store=store)
+    return app
+
+class TestProfiling:
+
+    def test_profiles_only_with_token(self, db_engine):
+        store = ProfileStore(max_reports=2)
+        client = TestClient(build_app(db_engine, store))
+
+        response = client.get("/slow")
+        assert response.json() == {"total": 42, "size": 1000}
+        assert "x-profile-id" not in response.headers
+        assert client.get("/slow", headers={"X-Profile": "wrong"}).headers.get("x-profile-id") is None
+        assert store.summaries() == []
+
+        response = client.get("/slow", headers={"X-Profile": "secret"})
+        assert response.status_code == 200
+        report = store.get(int(response.headers["x-profile-id"]))
+        assert report["status"] == 200
+        assert report["path"] == "/slow"
+        assert [s["statement"] for s in report["statements"]] == ["SELECT 40 + 2"]
+        # The endpoint body ran in the threadpool and still shows up in the profile
+        assert "slow" in report["profile"]
+        assert report["allocations"]
+
+    def test_store_keeps_most_recent(self, db_engine):
+        store = ProfileStore(max_reports=2)
+        client = TestClient(build_app(db_engine, store))
+        for _ in range(3):
+            client.get("/slow", headers={"X-Profile": "secret"})
+        assert [summary["id"] for summary in store.summaries()] == [3, 2]
+        assert store.get(1) is None
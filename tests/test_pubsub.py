@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from datetime import datetime
+import pytest
+from app.models.models import Program, Activity, User, UserProgress
+from app.utils.pubsub import Broadcaster, Broker, broker as app_broker, format_sse
+
+class TestPubSub:
+
+    def test_publish_from_worker_thread(self):
+        async def scenario():
+            broker = Broker()
+            subscription = broker.subscribe("user:1")
+            thread = threading.Thread(target=broker.publish, args=("user:1", {"type": "activity_completed", "activity_id": 7}))
+            thread.start()
+            thread.join()
+            events, dropped = await subscription.next_batch(timeout=1)
+            other = broker.subscribe("user:2")
+            assert await other.next_batch(timeout=0.01) == ([], 0)
+            broker.unsubscribe(subscription)
+            broker.unsubscribe(other)
+            return events, dropped
+
+        events, dropped = asyncio.run(scenario())
+        assert events == [{"type": "activity_completed", "activity_id": 7}]
+        assert dropped == 0
+
+    def test_slow_consumer_coalesces_and_drops(self):
+        async def scenario():
+            broker = Broker()
+            subscription = broker.subscribe("user:1", max_pending=3)
+            for i in range(3):
+                broker.publish("user:1", {"type": "activity_completed", "coalesce_key": "day-1", "activity_id": i})
+            for i in range(4):
+                broker.publish("user:1", {"type": "activity_completed", "activity_id": 10 + i})
+            return await subscription.next_batch(timeout=1)
+
+        events, dropped = asyncio.run(scenario())
+        # The three same-day events coalesced into one, which was then dropped along with the oldest plain event
+        assert [event["activity_id"] for event in events] == [11, 12, 13]
+        assert dropped == 2
+
+    def test_format_sse(self):
+        assert format_sse("ping", {"a": 1}) == 'event: ping\ndata: {"a": 1}\n\n'
+
+    def test_broadcaster_requires_publish(self):
+        class Incomplete(Broadcaster):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_same_day_completions_of_different_activities_are_kept(self, client, db_session):
+        program = Program(name="Events", description="", duration_days=30)
+        user = User(username="listener", email="listener@example.com")
+        db_session.add_all([program, user])
+        db_session.commit()
+        activities = [
+            Activity(program_id=program.id, title=title, description="", day_number=1, category="Reading")
+            for title in ("Read", "Reflect")
+        ]
+        db_session.add_all(activities)
+        db_session.add(UserProgress(user_id=user.id, program_id=program.id, start_date=datetime(2025, 1, 1), is_active=True))
+        db_session.commit()
+        user_id, activity_ids = user.id, [activity.id for activity in activities]
+
+        async def scenario():
+            subscription = app_broker.subscribe(f"user:{user_id}")
+            try:
+                for activity_id in activity_ids:
+                    response = client.post(f"/api/v1/users/{user_id}/complete-activity", json={
+                        "activity_id": activity_id, "completion_date": "2025-01-01T00:00:00"
+                    })
+                    assert response.status_code == 200
+                return await subscription.next_batch(timeout=1)
+            finally:
+                app_broker.unsubscribe(subscription)
+
+        events, dropped = asyncio.run(scenario())
+        assert [event["activity_id"] for event in events] == activity_ids
+        assert dropped == 0
@@ -0,0 +1,85 @@
+from datetime import date, datetime
+from sqlalchemy import event
+from app.database.rollups import RollupScheduler, _max_version, _program_day_totals, _touched_days, run_rollups
+from app.models.models import Program, Activity, User, UserActivityCompletion
+
+class TestDailyRollups:
+
+    def test_incremental_rollups(self, client, db_session):
+        program = Program(name="Rollup Program", description="Stats", duration_days=30)
+        users = [User(username=f"roller{i}", email=f"roller{i}@example.com") for i in range(2)]
+        db_session.add(program)
+        db_session.add_all(users)
+        db_session.commit()
+        program_id = program.id
+        run_ = Activity(program_id=program_id, title="Run", description="", day_number=1,
+                        duration_minutes=10, category="Exercise")
+        sit = Activity(program_id=program_id, title="Sit", description="", day_number=1,
+                       duration_minutes=5, category="Meditation")
+        db_session.add_all([run_, sit])
+        db_session.commit()
+
+        for user in users:
+            db_session.add(UserActivityCompletion(user_id=user.id, activity_id=run_.id,
+                                                  completion_date=datetime(2025, 5, 1)))
+        db_session.add(UserActivityCompletion(user_id=users[0].id, activity_id=sit.id,
+                                              completion_date=datetime(2025, 5, 1)))
+        db_session.commit()
+
+        assert run_rollups(db_session) == 1
+        assert run_rollups(db_session) == 0  # Nothing new since the high-water mark
+
+        db_session.add(UserActivityCompletion(user_id=users[1].id, activity_id=sit.id,
+                                              completion_date=datetime(2025, 5, 2)))
+        db_session.commit()
+        assert run_rollups(db_session) == 1
+
+        response = client.get(f"/api/v1/programs/{program_id}/daily-stats",
+                              params={"start": "2025-05-01", "end": "2025-05-31"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["days"] == [
+            {"day": "2025-05-01", "completions": 3, "active_users": 2, "minutes": 25},
+            {"day": "2025-05-02", "completions": 1, "active_users": 1, "minutes": 5},
+        ]
+        assert data["categories"] == [
+            {"category": "Exercise", "completions": 2, "minutes": 20},
+            {"category": "Meditation", "completions": 2, "minutes": 10},
+        ]
+
+    def test_daily_stats_rejects_inverted_range(self, client):
+        response = client.get("/api/v1/programs/1/daily-stats", params={"start": "2025-05-02", "end": "2025-05-01"})
+        assert response.status_code == 400
+
+    def test_only_one_scheduler_runs_rollups(self, tmp_path):
+        lock_path = str(tmp_path / "rollups.lock")
+        # Two schedulers stand in for two workers; flock locks are per open file, so this holds in one process too
+        first = RollupScheduler(None, interval_seconds=3600, lock_path=lock_path)
+        second = RollupScheduler(None, interval_seconds=3600, lock_path=lock_path)
+        assert first.is_leader()
+        assert first.is_leader()
+        assert not second.is_leader()
+        first.stop()
+        assert second.is_leader()
+        second.stop()
+        assert RollupScheduler(None, interval_seconds=3600).is_leader()
+
+    def test_incremental_queries_use_indexes(self, db_engine, db_session):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            _max_version(db_session)
+            _touched_days(db_session, 5, 10)
+            _program_day_totals(db_session, 1, {date(2025, 5, 1), date(2025, 5, 3)})
+        finally:
+            event.remove(db_engine, "before_cursor_execute", record)
+
+        connection = db_session.connection()
+        for statement, parameters in statements:
+            plan = [row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            # No full pass over either completion table, however large the history
+            assert not any(step.startswith("SCAN user_activity_completions") for step in plan), plan
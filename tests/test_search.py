@@ -0,0 +1,47 @@
+from app.models.models import Program, Activity
+
+class TestSearch:
+
+    def seed(self, db_session):
+        meditation = Program(name="Mindful Meditation", description="A journey to calm", duration_days=30)
+        fitness = Program(name="Fitness Challenge", description="Daily exercises", duration_days=30)
+        db_session.add_all([meditation, fitness])
+        db_session.commit()
+        db_session.add_all([
+            Activity(program_id=fitness.id, title="Jumping Jacks", description="Breathe steadily while jumping",
+                     day_number=1, category="Exercise"),
+            Activity(program_id=meditation.id, title="Mindful Breathing", description="Focus on your breath",
+                     day_number=1, category="Mindfulness"),
+        ])
+        db_session.commit()
+        return meditation.id, fitness.id
+
+    def test_search_ranks_titles_first(self, client, db_session):
+        self.seed(db_session)
+        response = client.get("/api/v1/search", params={"q": "breath"})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["title"] for r in results] == ["Mindful Breathing", "Jumping Jacks"]
+        assert all(r["kind"] == "activity" for r in results)
+
+    def test_search_tracks_updates_and_deletes(self, client, db_session):
+        meditation_id, _ = self.seed(db_session)
+        program = db_session.get(Program, meditation_id)
+        program.name = "Evening Wind Down"
+        db_session.commit()
+
+        titles = [r["title"] for r in client.get("/api/v1/search", params={"q": "wind"}).json()["results"]]
+        assert titles == ["Evening Wind Down"]
+
+        activity = db_session.query(Activity).filter(Activity.title == "Jumping Jacks").one()
+        db_session.delete(activity)
+        db_session.commit()
+        titles = [r["title"] for r in client.get("/api/v1/search", params={"q": "jumping"}).json()["results"]]
+        assert titles == []
+
+    def test_search_pagination_and_syntax_safety(self, client, db_session):
+        self.seed(db_session)
+        page = client.get("/api/v1/search", params={"q": "mindful", "limit": 1, "offset": 1}).json()
+        assert len(page["results"]) == 1
+        response = client.get("/api/v1/search", params={"q": '"unbalanced AND ('})
+        assert response.status_code == 200
@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import tempfile
+import pytest
+from sqlalchemy import func, select
+from app.database.archive import archive_cutoff, archive_enrollment
+from app.database.rollups import run_rollups
+from app.database.sharding import (
+    SHARD_ID_BITS, ShardRouter, format_shard_tags, set_shard_router, shard_index, user_sessions
+)
+from app.models.models import (
+    Program, Activity, User, UserProgress, UserActivityCompletion, ArchivedActivityCompletion, ShardRebalance
+)
+from rebalance_shards import clear_window, rebalance
+
+@pytest.fixture
+def shard_urls():
+    paths = []
+    for _ in range(3):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        paths.append(path)
+    yield [f"sqlite:///{path}" for path in paths]
+    for path in paths:
+        os.unlink(path)
+
+@pytest.fixture
+def router(db_engine, shard_urls):
+    router = ShardRouter(shard_urls[:2], catalog_url=str(db_engine.url))
+    router.create_all()
+    set_shard_router(router)
+    yield router
+    set_shard_router(None)
+    router.dispose()
+
+def _count(router, index, model):
+    with router.session_for_shard(index) as shard_db:
+        return shard_db.scalar(select(func.count()).select_from(model))
+
+class TestSharding:
+
+    def _setup(self, db_session):
+        program = Program(name="Sharded Program", description="Split", duration_days=30)
+        users = [User(username=f"shard{i}", email=f"shard{i}@example.com") for i in range(6)]
+        db_session.add(program)
+        db_session.add_all(users)
+        db_session.commit()
+        activity = Activity(program_id=program.id, title="Walk", description="", day_number=1,
+                            duration_minutes=5, category="Exercise")
+        db_session.add(activity)
+        db_session.commit()
+        return program.id, activity.id, [user.id for user in users]
+
+    def test_user_rows_land_on_their_shard(self, client, db_session, router):
+        program_id, activity_id, user_ids = self._setup(db_session)
+        assert {shard_index(user_id, 2) for user_id in user_ids} == {0, 1}
+
+        response = client.post(f"/api/v1/programs/{program_id}/enroll",
+                               json={"user_ids": user_ids, "start_date": "2025-05-01T00:00:00"})
+        assert response.json()["enrolled"] == len(user_ids)
+        for user_id in user_ids:
+            response = client.post(f"/api/v1/users/{user_id}/complete-activity",
+                                   json={"activity_id": activity_id, "completion_date": "2025-05-01T08:00:00"})
+            assert response.status_code == 200
+            plan = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/day-plan",
+                                  params={"date": "2025-05-01"}).json()
+            assert plan["activities"][0]["is_completed"] is True
+
+        # Nothing user-scoped in the catalog; each shard holds exactly its users
+        assert db_session.scalar(select(func.count()).select_from(UserActivityCompletion)) == 0
+        for index in range(2):
+            expected = sum(1 for user_id in user_ids if shard_index(user_id, 2) == index)
+            assert _count(router, index, UserProgress) == expected
+            assert _count(router, index, UserActivityCompletion) == expected
+
+        export = client.get(f"/api/v1/programs/{program_id}/completions/export", params={"format": "ndjson"})
+        assert len(export.text.splitlines()) == len(user_ids)
+        analytics = client.get(f"/api/v1/programs/{program_id}/analytics").json()
+        assert analytics["enrolled_users"] == len(user_ids)
+
+        with user_sessions(db_session) as user_dbs:
+            assert run_rollups(db_session, user_dbs) == 1
+        stats = client.get(f"/api/v1/programs/{program_id}/daily-stats",
+                           params={"start": "2025-05-01", "end": "2025-05-01"}).json()
+        assert stats["days"][0]["active_users"] == len(user_ids)
+
+    def test_rebalance_moves_users(self, client, db_session, router, shard_urls):
+        program_id, activity_id, user_ids = self._setup(db_session)
+        client.post(f"/api/v1/programs/{program_id}/enroll",
+                    json={"user_ids": user_ids, "start_date": "2025-05-01T00:00:00"})
+        for user_id in user_ids:
+            client.post(f"/api/v1/users/{user_id}/complete-activity",
+                        json={"activity_id": activity_id, "completion_date": "2025-05-01T08:00:00"})
+
+        def completion_ids(active_router):
+            ids = {}
+            for index in range(active_router.shard_count):
+                with active_router.session_for_shard(index) as shard_db:
+                    ids.update(shard_db.execute(
+                        select(UserActivityCompletion.user_id, UserActivityCompletion.id)
+                    ).all())
+            return ids
+
+        # Each shard hands out ids from its own range
+        before = completion_ids(router)
+        for user_id, completion_id in before.items():
+            assert completion_id >> SHARD_ID_BITS == router.tags[shard_index(user_id, 2)]
+
+        # One moving user's completions are archived first; the archive keeps the original id
+        archived_user = next(user_id for user_id in user_ids if shard_index(user_id, 2) != shard_index(user_id, 3))
+        with router.session_for(archived_user) as shard_db:
+            assert archive_enrollment(shard_db, archived_user, program_id, archive_cutoff()) == 1
+
+        moved = rebalance(shard_urls[:2], shard_urls, catalog_url=router.catalog_url, drain_seconds=0)
+        assert moved == sum(1 for user_id in user_ids if shard_index(user_id, 2) != shard_index(user_id, 3))
+
+        # Workers still on the old shard list stay in the maintenance window
+        response = client.get(f"/api/v1/users/{user_ids[0]}/programs/{program_id}/day-plan",
+                              params={"date": "2025-05-01"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"]
+
+        new_router = ShardRouter(shard_urls, catalog_url=router.catalog_url)
+        set_shard_router(new_router)
+        try:
+            for index in range(3):
+                expected = sum(1 for user_id in user_ids if shard_index(user_id, 3) == index and user_id != archived_user)
+                assert _count(new_router, index, UserActivityCompletion) == expected
+            for user_id in user_ids:
+                plan = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/day-plan",
+                                  params={"date": "2025-05-01"}).json()
+                assert plan["activities"][0]["is_completed"] is True
+            # Moved rows keep their ids
+            with new_router.session_for(archived_user) as shard_db:
+                assert shard_db.scalar(select(ArchivedActivityCompletion.id)) == before.pop(archived_user)
+            assert completion_ids(new_router) == before
+
+            clear_window(router.catalog_url)
+            set_shard_router(router)
+            response = client.get(f"/api/v1/users/{user_ids[0]}/sync")
+            assert response.status_code == 200
+        finally:
+            new_router.dispose()
+
+    def test_user_rows_are_refused_during_rebalance(self, client, db_session, router):
+        program_id, activity_id, user_ids = self._setup(db_session)
+        db_session.add(ShardRebalance(id=1, shard_tags=format_shard_tags(router.tags), finished=False))
+        db_session.commit()
+
+        response = client.post(f"/api/v1/programs/{program_id}/enroll",
+                               json={"user_ids": user_ids, "start_date": "2025-05-01T00:00:00"})
+        assert response.status_code == 503
+        response = client.post(f"/api/v1/users/{user_ids[0]}/complete-activity",
+                               json={"activity_id": activity_id, "completion_date": "2025-05-01T08:00:00"})
+        assert response.status_code == 503
+        assert sum(_count(router, index, UserProgress) for index in range(2)) == 0
+
+        # A finished move lets workers on the new shard list through
+        db_session.query(ShardRebalance).update({"finished": True})
+        db_session.commit()
+        response = client.post(f"/api/v1/programs/{program_id}/enroll",
+                               json={"user_ids": user_ids, "start_date": "2025-05-01T00:00:00"})
+        assert response.json()["enrolled"] == len(user_ids)
+
+    def test_completions_do_not_lock_the_catalog(self, client, db_session, router, db_engine):
+        program_id, activity_id, user_ids = self._setup(db_session)
+        client.post(f"/api/v1/programs/{program_id}/enroll",
+                    json={"user_ids": user_ids, "start_date": "2025-05-01T00:00:00"})
+        cursors = {user_id: client.get(f"/api/v1/users/{user_id}/sync").json()["cursor"] for user_id in user_ids}
+        db_session.close()
+
+        # Hold the catalog's write lock: versioning a completion must only write to its shard
+        catalog = sqlite3.connect(db_engine.url.database, isolation_level=None, timeout=0)
+        catalog.execute("BEGIN IMMEDIATE")
+        try:
+            for user_id in user_ids:
+                response = client.post(f"/api/v1/users/{user_id}/complete-activity",
+                                       json={"activity_id": activity_id, "completion_date": "2025-05-01T08:00:00"})
+                assert response.status_code == 200
+        finally:
+            catalog.execute("ROLLBACK")
+            catalog.close()
+
+        for user_id in user_ids:
+            data = client.get(f"/api/v1/users/{user_id}/sync", params={"since": cursors[user_id]}).json()
+            assert [c["activity_id"] for c in data["completions"]] == [activity_id]
+            assert data["programs"] == [] and data["activities"] == []
+
+        with user_sessions(db_session) as user_dbs:
+            assert run_rollups(db_session, user_dbs) == 1
+            assert run_rollups(db_session, user_dbs) == 0
@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.utils.singleflight import SingleFlight, SingleFlightTimeout
+
+def wait_for_waiters(flight, key, count):
+    deadline = time.monotonic() + 5
+    while flight._calls[key].waiters < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_run(self):
+        flight = SingleFlight(timeout=5)
+        release = threading.Event()
+        runs = []
+
+        def lookup():
+            runs.append(1)
+            release.wait(5)
+            return {"id": 1}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            leader = pool.submit(flight.do, "program:1", lookup)
+            while flight.in_flight() == 0:
+                time.sleep(0.001)
+            followers = [pool.submit(flight.do, "program:1", lookup) for _ in range(4)]
+            wait_for_waiters(flight, "program:1", 4)
+            release.set()
+            results = [leader.result()] + [f.result() for f in followers]
+
+        assert len(runs) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.in_flight() == 0
+        # The next call after completion runs again instead of reusing the old result
+        assert flight.do("program:1", lambda: "fresh") == "fresh"
+
+    def test_errors_propagate_to_waiters(self):
+        flight = SingleFlight(timeout=5)
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise LookupError("database unavailable")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "key", failing)
+            while flight.in_flight() == 0:
+                time.sleep(0.001)
+            follower = pool.submit(flight.do, "key", failing)
+            wait_for_waiters(flight, "key", 1)
+            release.set()
+            for future in (leader, follower):
+                with pytest.raises(LookupError):
+                    future.result()
+
+    def test_waiter_times_out(self):
+        flight = SingleFlight(timeout=0.05)
+        release = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "slow", lambda: release.wait(5))
+            while flight.in_flight() == 0:
+                time.sleep(0.001)
+            with pytest.raises(SingleFlightTimeout):
+                flight.do("slow", lambda: None)
+            release.set()
+            assert leader.result() is True
@@ -0,0 +1,103 @@
+import os
+from sqlalchemy.orm import sessionmaker
+from app.database.records import ActivityRecord
+from app.database.snapshot import CatalogSnapshot, SnapshotManager, build_snapshot, set_snapshot_manager
+from app.models.models import Program, Activity
+
+def add_program(db_session, name, days, category="Reading"):
+    program = Program(name=name, description="Café ☕ mornings", duration_days=30)
+    db_session.add(program)
+    db_session.commit()
+    for day in days:
+        db_session.add(Activity(program_id=program.id, title=f"{name} day {day}", description=None if category is None else "",
+                                day_number=day, duration_minutes=5, category=category))
+    db_session.commit()
+    return program.id
+
+class TestCatalogSnapshot:
+
+    def test_snapshot_round_trip(self, db_session, tmp_path):
+        first = add_program(db_session, "First", [2, 1, 1, 3], category=None)
+        second = add_program(db_session, "Second", [])
+        path = str(tmp_path / "catalog.snap")
+        build_snapshot(db_session, path)
+
+        snapshot = CatalogSnapshot(path)
+        assert snapshot.program_count == 2
+        assert snapshot.activity_count == 4
+        days = [a.day_number for a in snapshot.activities_for_program(first)]
+        assert days == [1, 1, 2, 3]
+        day_two = snapshot.activities_for_days(first, 2, 2)
+        assert day_two == [ActivityRecord(day_two[0].id, first, "First day 2", None, 2, 5, None)]
+        assert snapshot.activities_for_days(first, 1, 2)[-1] == day_two[0]
+
+        program = snapshot.get_program(second)
+        assert program["description"] == "Café ☕ mornings"
+        assert program["activities"] == []
+        assert snapshot.get_program(999) is None
+        assert snapshot.activities_for_days(999, 1, 30) == []
+
+    def test_manager_rebuilds_on_change(self, db_engine, db_session, tmp_path):
+        program_id = add_program(db_session, "Live", [1])
+        path = str(tmp_path / "catalog.snap")
+        manager = SnapshotManager(path, sessionmaker(bind=db_engine), refresh_seconds=0)
+        manager.start()
+        original = manager.snapshot
+        inode = os.stat(path).st_ino
+
+        manager.refresh()
+        assert manager.snapshot is original  # Unchanged catalog, nothing rebuilt
+
+        db_session.add(Activity(program_id=program_id, title="New", description="", day_number=2,
+                                duration_minutes=5, category="Reading"))
+        db_session.commit()
+        manager.refresh()
+        assert os.stat(path).st_ino != inode
+        assert [a.title for a in manager.snapshot.activities_for_program(program_id)] == ["Live day 1", "New"]
+        # The old mapping stays readable for requests still holding it
+        assert len(original.activities_for_program(program_id)) == 1
+
+    def test_endpoints_read_from_snapshot(self, client, db_engine, db_session, tmp_path):
+        program_id = add_program(db_session, "Mapped", [1, 2])
+        manager = SnapshotManager(str(tmp_path / "catalog.snap"), sessionmaker(bind=db_engine), refresh_seconds=0)
+        manager.start()
+        set_snapshot_manager(manager)
+        try:
+            # A write made elsewhere (here, straight to the database) shows up on the next refresh
+            db_session.get(Program, program_id).name = "Renamed"
+            db_session.commit()
+            response = client.get(f"/api/v1/programs/{program_id}")
+            assert response.json()["name"] == "Mapped"
+            assert [a["day_number"] for a in response.json()["activities"]] == [1, 2]
+            response = client.get(f"/api/v1/programs/{program_id}/activities", params={"day_number": 2})
+            assert [a["title"] for a in response.json()] == ["Mapped day 2"]
+
+            # Writes through the API are visible to the very next read
+            inode = manager.snapshot.inode
+            client.post("/api/v1/activities/", json={
+                "program_id": program_id, "title": "Added", "description": "", "day_number": 2, "category": "Reading"
+            })
+            response = client.get(f"/api/v1/programs/{program_id}/activities", params={"day_number": 2})
+            assert [a["title"] for a in response.json()] == ["Mapped day 2", "Added"]
+            assert client.get(f"/api/v1/programs/{program_id}").json()["name"] == "Renamed"
+            assert manager.snapshot.inode != inode
+
+            newer = client.post("/api/v1/programs/", json={"name": "Newer", "description": "", "duration_days": 30})
+            response = client.get(f"/api/v1/programs/{newer.json()['id']}")
+            assert response.json()["name"] == "Newer"
+            assert manager.snapshot.has_program(newer.json()["id"])
+        finally:
+            set_snapshot_manager(None)
+
+    def test_background_refresh_falls_back_until_caught_up(self, db_engine, db_session, tmp_path):
+        add_program(db_session, "Pending", [1])
+        manager = SnapshotManager(str(tmp_path / "catalog.snap"), sessionmaker(bind=db_engine), refresh_seconds=3600)
+        manager.start()
+        try:
+            assert manager.current() is manager.snapshot
+            manager._changes += 1  # A write whose refresh has not run yet
+            assert manager.current() is None
+            manager.refresh()
+            assert manager.current() is manager.snapshot
+        finally:
+            manager.stop()
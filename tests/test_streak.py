@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from app.models.models import Program, Activity, User, UserProgress
+import pytest
+from app.utils.streak_utils import (
+    MASK_DAYS, current_streak, day_bit, longest_streak, count_completed_days, compute_completion_mask
+)
+
+class TestStreakBitset:
+
+    def test_mask_helpers(self):
+        mask = compute_completion_mask([1, 2, 3, 5, 6, 40], duration_days=30)
+        assert mask == 0b110111
+        assert count_completed_days(mask) == 5
+        assert longest_streak(mask) == 3
+        assert current_streak(mask, 6) == 2
+        assert current_streak(mask, 7) == 2  # Today not completed yet
+        assert current_streak(mask, 8) == 0
+        assert current_streak(mask, 3) == 3
+
+    def test_complete_activity_updates_streak(self, client, db_session):
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        start = today - timedelta(days=2)
+        program = Program(name="Streak Program", description="Streaks", duration_days=30)
+        user = User(username="streaker", email="streaker@example.com")
+        db_session.add_all([program, user])
+        db_session.commit()
+        program_id, user_id = program.id, user.id
+        activities = [
+            Activity(program_id=program_id, title=f"Day {day}", description="", day_number=day, category="Exercise")
+            for day in range(1, 4)
+        ]
+        db_session.add_all(activities)
+        db_session.add(UserProgress(user_id=user_id, program_id=program_id, start_date=start, is_active=True))
+        db_session.commit()
+        activity_ids = [activity.id for activity in activities]
+
+        for offset in (1, 2):
+            response = client.post(f"/api/v1/users/{user_id}/complete-activity", json={
+                "activity_id": activity_ids[offset],
+                "completion_date": (start + timedelta(days=offset)).isoformat()
+            })
+            assert response.status_code == 200
+
+        response = client.get(f"/api/v1/users/{user_id}/programs/{program_id}/streak")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["current_day"] == 3
+        assert data["current_streak"] == 2
+        assert data["longest_streak"] == 2
+        assert data["completed_days"] == 2
+        assert data["heatmap"][:4] == [False, True, True, False]
+
+    def test_mask_bounds(self):
+        assert day_bit(MASK_DAYS) == 1 << 62
+        with pytest.raises(ValueError):
+            day_bit(MASK_DAYS + 1)
+        assert compute_completion_mask([1, 64, 90], duration_days=90) == 1
+
+    def test_long_programs_and_missing_start_dates(self, client, db_session):
+        long_program = Program(name="Long Program", description="", duration_days=90)
+        short_program = Program(name="Undated Program", description="", duration_days=30)
+        user = User(username="marathoner", email="marathoner@example.com")
+        db_session.add_all([long_program, short_program, user])
+        db_session.commit()
+        late = Activity(program_id=long_program.id, title="Day 70", description="", day_number=70, category="Exercise")
+        first = Activity(program_id=short_program.id, title="Day 1", description="", day_number=1, category="Exercise")
+        db_session.add_all([late, first])
+        db_session.add_all([
+            UserProgress(user_id=user.id, program_id=long_program.id, start_date=datetime(2025, 1, 1), is_active=True),
+            UserProgress(user_id=user.id, program_id=short_program.id, start_date=None, is_active=True),
+        ])
+        db_session.commit()
+        user_id, long_id, short_id = user.id, long_program.id, short_program.id
+
+        # Completions are still recorded; only the mask is skipped
+        for activity_id, completion_date in ((late.id, "2025-03-11T00:00:00"), (first.id, "2025-01-01T00:00:00")):
+            response = client.post(f"/api/v1/users/{user_id}/complete-activity", json={
+                "activity_id": activity_id, "completion_date": completion_date
+            })
+            assert response.status_code == 200
+
+        assert client.get(f"/api/v1/users/{user_id}/programs/{long_id}/streak").status_code == 422
+        assert client.get(f"/api/v1/users/{user_id}/programs/{short_id}/streak").status_code == 409
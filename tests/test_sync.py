@@ -0,0 +1,67 @@
+from datetime import datetime
+from app.models.models import Program, Activity, User, UserProgress
+
+class TestDeltaSync:
+
+    def seed(self, db_session):
+        program = Program(name="Sync Program", description="Offline", duration_days=30)
+        user = User(username="syncer", email="syncer@example.com")
+        db_session.add_all([program, user])
+        db_session.commit()
+        program_id, user_id = program.id, user.id
+        db_session.add(Activity(program_id=program_id, title="Day 1", description="", day_number=1, category="Reading"))
+        db_session.add(UserProgress(user_id=user_id, program_id=program_id, start_date=datetime(2025, 1, 1), is_active=True))
+        db_session.commit()
+        return user_id, program_id
+
+    def test_full_then_incremental_sync(self, client, db_session):
+        user_id, program_id = self.seed(db_session)
+
+        response = client.get(f"/api/v1/users/{user_id}/sync")
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["id"] for p in data["programs"]] == [program_id]
+        assert len(data["activities"]) == 1
+        cursor = data["cursor"]
+
+        # Nothing changed since the cursor
+        data = client.get(f"/api/v1/users/{user_id}/sync", params={"since": cursor}).json()
+        assert data == {"cursor": cursor, "programs": [], "activities": [], "completions": []}
+
+        # A completion is the only change
+        activity_id = client.get(f"/api/v1/users/{user_id}/sync").json()["activities"][0]["id"]
+        client.post(f"/api/v1/users/{user_id}/complete-activity", json={
+            "activity_id": activity_id, "completion_date": "2025-01-01T00:00:00"
+        })
+        data = client.get(f"/api/v1/users/{user_id}/sync", params={"since": cursor}).json()
+        assert data["programs"] == [] and data["activities"] == []
+        assert [c["activity_id"] for c in data["completions"]] == [activity_id]
+        assert data["cursor"] != cursor
+
+    def test_invalid_cursor(self, client):
+        response = client.get("/api/v1/users/1/sync", params={"since": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_enrollment_after_cursor_sends_whole_program(self, client, db_session):
+        user_id, _ = self.seed(db_session)
+        other = Program(name="Joined Later", description="", duration_days=7)
+        db_session.add(other)
+        db_session.commit()
+        other_id = other.id
+        db_session.add(Activity(program_id=other_id, title="Day 1", description="", day_number=1, category="Reading"))
+        db_session.commit()
+
+        cursor = client.get(f"/api/v1/users/{user_id}/sync").json()["cursor"]
+
+        # The program and its activities predate the cursor; only the enrollment is new
+        client.post("/api/v1/user-progress/", json={
+            "user_id": user_id, "program_id": other_id, "start_date": "2025-01-01T00:00:00"
+        })
+        data = client.get(f"/api/v1/users/{user_id}/sync", params={"since": cursor}).json()
+        assert [p["id"] for p in data["programs"]] == [other_id]
+        assert [a["program_id"] for a in data["activities"]] == [other_id]
+        assert data["cursor"] != cursor
+
+        # Sent once: the next sync from the new cursor is empty
+        data = client.get(f"/api/v1/users/{user_id}/sync", params={"since": data["cursor"]}).json()
+        assert data["programs"] == [] and data["activities"] == []